@@ -0,0 +1,135 @@
+"""The photos the puzzle can be played with, found by scanning directories.
+
+An sqlite index remembers each image's size, modification time, dimensions and
+orientation, so a rescan only opens files that are new or have changed. Board-sized
+copies of each image are rendered the first time a grid size needs them and kept in
+the same index, so switching to a photo seen before never decodes the original again.
+"""
+import io
+import os
+import sqlite3
+import threading
+
+from PIL import Image, ImageOps
+
+import PuzzleSolver
+
+IMAGE_INDEX_PATH = os.path.join(PuzzleSolver.PATTERN_DB_DIR, "images.sqlite")
+
+# Directories scanned when none are given: the game's own folder
+DEFAULT_IMAGE_DIRS = [os.path.dirname(os.path.abspath(__file__))]
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp'}
+
+# EXIF orientations that turn the picture on its side
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+class ImageLibrary:
+    """Images in a list of directories, indexed in an sqlite file.
+
+    scan() brings the index up to date and returns the images in order; info() and
+    thumbnail() answer from the index. Thumbnails are safe to request from a
+    background thread while the UI thread scans.
+    """
+    def __init__(self, directories=None, index_path=IMAGE_INDEX_PATH):
+        self.directories = [os.path.abspath(os.path.expanduser(directory))
+                            for directory in (directories or DEFAULT_IMAGE_DIRS)]
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+            self._db = sqlite3.connect(index_path, timeout=30, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+        except (OSError, sqlite3.Error) as e:
+            print(f"Could not open image index {index_path}, keeping it in memory only: {e}")
+            self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS images (path TEXT PRIMARY KEY, mtime_ns INTEGER, "
+                             "size INTEGER, width INTEGER, height INTEGER, orientation TEXT)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS thumbnails (path TEXT, edge INTEGER, data BLOB, "
+                             "PRIMARY KEY (path, edge))")
+
+    @staticmethod
+    def _read_header(path):
+        """Width, height and orientation of an image as displayed, read without decoding its pixels"""
+        with Image.open(path) as image:
+            width, height = image.size
+            if image.getexif().get(EXIF_ORIENTATION, 1) in ROTATED_ORIENTATIONS:
+                width, height = height, width
+        orientation = 'landscape' if width > height else 'portrait' if height > width else 'square'
+        return width, height, orientation
+
+    def scan(self):
+        """Index new and changed images, forget deleted ones and return every image's path in order"""
+        found = {}
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                print(f"Could not scan {directory}: {e}")
+                continue
+            for entry in entries:
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                    stat = entry.stat()
+                    found[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            known = {path: (mtime_ns, size) for path, mtime_ns, size in
+                     self._db.execute("SELECT path, mtime_ns, size FROM images")}
+            changed = []
+            for path, signature in found.items():
+                if known.get(path) == signature:
+                    continue
+                try:
+                    changed.append((path, *signature, *self._read_header(path)))
+                except (OSError, Image.DecompressionBombError) as e:
+                    print(f"Skipping {path}: {e}")
+            gone = [(path,) for path in known if path not in found and os.path.dirname(path) in self.directories]
+            # Thumbnails of a changed file are stale, so they go with its old row
+            stale = gone + [(row[0],) for row in changed]
+            with self._db:
+                self._db.executemany("DELETE FROM thumbnails WHERE path = ?", stale)
+                self._db.executemany("DELETE FROM images WHERE path = ?", gone)
+                self._db.executemany("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?)", changed)
+            indexed = {path for path, in self._db.execute("SELECT path FROM images")}
+        return sorted(path for path in found if path in indexed)
+
+    def info(self, path):
+        """The indexed width, height and orientation of an image, or None if it is not indexed"""
+        with self._lock:
+            row = self._db.execute("SELECT width, height, orientation FROM images WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('width', 'height', 'orientation'), row))
+
+    def thumbnail(self, path, edge):
+        """The image scaled to edge x edge pixels, decoded from the original only the first time"""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM thumbnails WHERE path = ? AND edge = ?", (path, edge)).fetchone()
+        if row is not None:
+            image = Image.open(io.BytesIO(row[0]))
+            image.load()
+            return image
+
+        with Image.open(path) as image:
+            # JPEGs decode straight to the smallest scale no smaller than the thumbnail
+            image.draft('RGB', (edge, edge))
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode == 'RGBA' else 'RGB')
+        # Large photos are shrunk by whole factors with reduce() before the final resample
+        image = image.resize((edge, edge), reducing_gap=2.0)
+
+        # Pixel-exact PNG when there is transparency, a high quality JPEG otherwise
+        data = io.BytesIO()
+        if image.mode == 'RGBA':
+            image.save(data, 'PNG')
+        else:
+            image.save(data, 'JPEG', quality=95)
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?)", (path, edge, data.getvalue()))
+            except sqlite3.Error as e:
+                print(f"Could not save thumbnail to the image index: {e}")
+        return image
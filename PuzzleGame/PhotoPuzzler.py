@@ -1,15 +1,43 @@
 import pygame
 import numpy as np
-from PIL import Image, ImageFilter
+from PIL import ImageFilter
 import os
-import random
-from queue import PriorityQueue
-from collections import deque
 import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import PuzzleSolver
+from ImageLibrary import ImageLibrary
+from PuzzleSolver import SearchCancelled, SearchStats, UnsolvableBoard
+
+# Boards this large get a quick weighted A* solution that keeps improving for
+# PuzzleSolver.ANYTIME_BUDGET seconds
+ANYTIME_MIN_GRID = 5
+
+# Frame rate while a tile slides; otherwise the main loop sleeps until there is something to do
+ANIMATION_FPS = 60
+# While a search runs or an image loads, the main loop checks on it this often, in milliseconds
+POLL_INTERVAL = 100
+
+# Tile sets of this many images stay converted in memory, so switching back to one is instant
+TILE_CACHE_SIZE = 4
+
+
+def decode_tiles(library, path, size, grid_size):
+    """Scale an image to size x size for a board of grid_size rows and columns of tiles.
+
+    Returns the whole board, which the tiles are drawn from by source rect, and a blurred
+    copy of the last tile, which stands in for the empty space. Only Pillow is used, so
+    this is safe to run off the UI thread.
+    """
+    image = library.thumbnail(path, size)
+    piece_size = size // grid_size
+    corner = size - piece_size
+    blurred = image.crop((corner, corner, size, size)).filter(ImageFilter.GaussianBlur(radius=15))
+    blurred = blurred.filter(ImageFilter.GaussianBlur(radius=15))
+    return image, blurred
 
-# Add message box functionality
-pygame.init()
-pygame.font.init()
 
 class MessageBox:
     def __init__(self, screen, message, width=400, height=200):
@@ -25,6 +53,7 @@ class MessageBox:
         self.button_font = pygame.font.Font(None, 28)
         self.visible = True
         self.button_hover = False
+        self._overlay = None  # Pre-rendered on first draw
 
         self.colors = {
             'background': (245, 245, 245),
@@ -54,31 +83,47 @@ class MessageBox:
         if not self.visible:
             return
 
+        # Everything is rendered once and reused, only the button changes with hover
+        if self._overlay is None:
+            self._render()
+        self.screen.blit(self._overlay, (0, 0))
+        self.screen.blit(self._body, (self.x, self.y))
+        self.screen.blit(self._buttons[self.button_hover], self.button_rect)
+
+    def _render(self):
         # Draw semi-transparent background
-        s = pygame.Surface((self.screen.get_width(), self.screen.get_height()), pygame.SRCALPHA)
-        s.fill((0, 0, 0, 128))
-        self.screen.blit(s, (0, 0))
+        self._overlay = pygame.Surface((self.screen.get_width(), self.screen.get_height()), pygame.SRCALPHA)
+        self._overlay.fill((0, 0, 0, 128))
+
+        # The shadow is opaque, as it was when drawn straight onto the display
+        self._body = pygame.Surface((self.width + 3, self.height + 3), pygame.SRCALPHA)
+        shadow_rect = pygame.Rect(3, 3, self.width, self.height)
+        pygame.draw.rect(self._body, (0, 0, 0), shadow_rect, border_radius=10)
 
-        shadow_rect = pygame.Rect(self.x + 3, self.y + 3, self.width, self.height)
-        pygame.draw.rect(self.screen, (0, 0, 0, 100), shadow_rect, border_radius=10)
-        
         # Draw main box
-        pygame.draw.rect(self.screen, self.colors['background'], self.rect, border_radius=10)
-        pygame.draw.rect(self.screen, self.colors['border'], self.rect, 2, border_radius=10)
+        box_rect = pygame.Rect(0, 0, self.width, self.height)
+        pygame.draw.rect(self._body, self.colors['background'], box_rect, border_radius=10)
+        pygame.draw.rect(self._body, self.colors['border'], box_rect, 2, border_radius=10)
 
         # Draw message lines
         for i, line in enumerate(self.lines):
             text_surface = self.font.render(line, True, self.colors['text'])
-            text_rect = text_surface.get_rect(center=(self.x + self.width//2, 
-                                                    self.y + self.height//2 - 20 + i * 30))
-            self.screen.blit(text_surface, text_rect)
+            text_rect = text_surface.get_rect(center=(self.width//2, self.height//2 - 20 + i * 30))
+            self._body.blit(text_surface, text_rect)
+
+        self._buttons = {hover: self._render_button(hover) for hover in (False, True)}
+
+    def _render_button(self, hover):
+        # Pre-rendered over the box background so it can be blitted opaque
+        surface = pygame.Surface(self.button_rect.size).convert()
+        surface.fill(self.colors['background'])
 
         button_surface = pygame.Surface((self.button_rect.width, self.button_rect.height), pygame.SRCALPHA)
 
         shadow_rect = pygame.Rect(2, 2, self.button_rect.width, self.button_rect.height)
         pygame.draw.rect(button_surface, (0, 0, 0, 100), shadow_rect, border_radius=5)
 
-        color = self.colors['button_hover'] if self.button_hover else self.colors['button']
+        color = self.colors['button_hover'] if hover else self.colors['button']
         for y in range(self.button_rect.height):
             alpha = int(255 * (1 - y / self.button_rect.height * 0.3))
             gradient_color = (*color[:3], alpha)
@@ -92,16 +137,22 @@ class MessageBox:
         highlight_color = (*color[:3], 100)
         pygame.draw.rect(button_surface, highlight_color, highlight_rect, border_radius=5)
 
-        self.screen.blit(button_surface, self.button_rect)
+        surface.blit(button_surface, (0, 0))
 
         text = "OK"
+        center = (self.button_rect.width // 2, self.button_rect.height // 2)
         shadow_surface = self.button_font.render(text, True, (0, 0, 0, 150))
-        shadow_rect = shadow_surface.get_rect(center=(self.button_rect.centerx + 1, self.button_rect.centery + 1))
-        self.screen.blit(shadow_surface, shadow_rect)
+        shadow_rect = shadow_surface.get_rect(center=(center[0] + 1, center[1] + 1))
+        surface.blit(shadow_surface, shadow_rect)
 
         text_surface = self.button_font.render(text, True, self.colors['button_text'])
-        text_rect = text_surface.get_rect(center=self.button_rect.center)
-        self.screen.blit(text_surface, text_rect)
+        text_rect = text_surface.get_rect(center=center)
+        surface.blit(text_surface, text_rect)
+        return surface
+
+    def handle_motion(self, pos):
+        if self.visible:
+            self.button_hover = self.button_rect.collidepoint(pos)
 
     def handle_click(self, pos):
         if not self.visible:
@@ -115,7 +166,7 @@ class MessageBox:
         return False
 
 class PhotoPuzzle:
-    def __init__(self, grid_size=3):
+    def __init__(self, grid_size=3, image_dirs=None):
         pygame.init()
         self.grid_size = grid_size #Default grid size is 3x3
         self.piece_size = 150 
@@ -132,12 +183,11 @@ class PhotoPuzzle:
         self.completion_message = None
         self.current_algorithm = None
 
-        # Available images
-        self.available_images = [
-            "2.jpg",
-            "1.png",
-            "3.jpg"
-        ]
+        # Available images, found in image_dirs or else the game's own folder
+        self.image_library = ImageLibrary(image_dirs)
+        self.available_images = self.image_library.scan()
+        if not self.available_images:
+            raise RuntimeError(f"No images found in {', '.join(self.image_library.directories)}")
         self.current_image_index = 0
 
         self.puzzle_top_padding = (self.window_height - self.puzzle_width) // 2
@@ -169,13 +219,31 @@ class PhotoPuzzle:
         # Initialize game state
         self.current_state = np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)
         self.empty_pos = (grid_size - 1, grid_size - 1) #Bottom right corner
+        self._count_misplaced()
         self.moves = 0
         self.solving = False
         self.solution_path = []
 
+        # Background search state
+        self.solver_thread = None
+        self.solver_action = None
+        self.cancel_requested = threading.Event()
+        self.solution_cache = PuzzleSolver.SolutionCache(PuzzleSolver.SOLUTION_CACHE_PATH)
+        self.search_progress = None
+        # The board a search started from, and the latest shorter solution an anytime search has handed over
+        self.search_start = None
+        self.offered_solution = None
+
+        # Solution playback, advanced a little every frame by update()
+        self.playback = None
+        self.playback_speeds = [0, 60, 125, 250, 500, 1000]  # Milliseconds per move, 0 plays instantly
+        self.playback_speed = 4
+
         # Timer variables
         self.start_time = None
         self.elapsed_time = 0
+        # Cleared while the window is minimized or hidden, so the timer stops waking the main loop
+        self.window_visible = True
         self.algorithm_time = 0
 
         self.timer_font = pygame.font.Font(None, 36) 
@@ -187,7 +255,25 @@ class PhotoPuzzle:
         except:
             self.title_font = pygame.font.Font(None, 42)
 
-        self.load_image()
+        # Damage tracking, see draw()
+        self.full_redraw = True
+        self._last_frame = None
+
+        # Pre-rendered buttons, title and stats panel, see _cached()
+        self._chrome_cache = {}
+        self._text_cache = {}
+
+        # Images are decoded on a background thread, see load_image()
+        self.image_loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-loader')
+        self.image_jobs = {}
+        self.tile_sets = OrderedDict()
+        self.pending_image = None
+        self.image_failures = 0
+        # Where each tile sits in the board image, indexed by piece number
+        self.tile_rects = [pygame.Rect(j * self.piece_size, i * self.piece_size, self.piece_size, self.piece_size)
+                           for i in range(self.grid_size) for j in range(self.grid_size)]
+
+        self.load_image(block=True)
 
         # Initialize buttons
         self.buttons = []
@@ -260,119 +346,282 @@ class PhotoPuzzle:
         })
 
         # Font for buttons
-        self.font = pygame.font.Font(None, 24) 
-
-    def load_image(self):
-        """Load the current image and prepare it for the puzzle"""
-        try:
-            self.original_image = Image.open(self.available_images[self.current_image_index])
-            self.original_image = self.original_image.resize((self.puzzle_width, self.puzzle_width))
-            self.pieces = self._split_image()
-            self.blurred_piece = self._create_blurred_piece()
-            # Reset and shuffle the puzzle
-            self._reset_puzzle()
-            self._shuffle_puzzle()
-        except Exception as e:
-            print(f"Error loading image: {e}")
-            self.current_image_index = (self.current_image_index + 1) % len(self.available_images)
-            self.load_image()
+        self.font = pygame.font.Font(None, 24)
+
+        # Regions repainted when the stats text changes, and the area the search progress line must stay in
+        self.timer_rect = pygame.Rect(self.stats_rect.left, self.stats_rect.top + 76, self.stats_rect.width, 32)
+        self.moves_rect = pygame.Rect(self.stats_rect.left, self.stats_rect.top + 116, self.stats_rect.width, 30)
+        progress_left = self.puzzle_width + self.padding * 2
+        self.progress_rect = pygame.Rect(progress_left, self.buttons[-1]['rect'].bottom + 5,
+                                         self.window_width - progress_left, 30) 
+
+    def load_image(self, block=False):
+        """Switch to the current image once its tiles are ready.
+
+        Tiles are decoded on a background thread, so unless block is set this returns
+        at once and update() finishes the switch when they arrive.
+        """
+        self.pending_image = self.available_images[self.current_image_index]
+        self._request_tiles(self.pending_image)
+        self._poll_image()
+        while block and self.pending_image is not None:
+            wait([self.image_jobs[self.pending_image]])
+            self._poll_image()
 
     def change_image(self):
+        # Rescanning only stats the files, so images added while the game runs show up here
+        current = self.available_images[self.current_image_index]
+        self.available_images = self.image_library.scan() or self.available_images
+        if current in self.available_images:
+            self.current_image_index = self.available_images.index(current)
         self.current_image_index = (self.current_image_index + 1) % len(self.available_images)
         self.load_image()
-        self._shuffle_puzzle()
 
-    def _split_image(self):
-        pieces = []
-        for i in range(self.grid_size):
-            for j in range(self.grid_size):
-                left = j * self.piece_size
-                top = i * self.piece_size
-                right = left + self.piece_size
-                bottom = top + self.piece_size
-                piece = self.original_image.crop((left, top, right, bottom))
-                pieces.append(piece)
-        return pieces
+    def _request_tiles(self, path):
+        # Start decoding unless the tiles are cached or already on their way
+        if path not in self.tile_sets and path not in self.image_jobs:
+            self.image_jobs[path] = self.image_loader.submit(decode_tiles, self.image_library, path,
+                                                         self.puzzle_width, self.grid_size)
+
+    def _collect_tiles(self):
+        """Convert finished decodes to display surfaces and add them to the tile cache"""
+        for path, job in list(self.image_jobs.items()):
+            # Failed decodes are left for _poll_image to report when the image is wanted
+            if not job.done() or job.exception() is not None:
+                continue
+            del self.image_jobs[path]
+            image, blurred = job.result()
+            # Convert once to the display format so drawing is a plain blit
+            self.tile_sets[path] = (self._to_surface(image), self._to_surface(blurred))
+            while len(self.tile_sets) > TILE_CACHE_SIZE:
+                self.tile_sets.popitem(last=False)
+
+    def _poll_image(self):
+        """Show the pending image if its tiles are ready, moving on to the next image if it failed to load"""
+        if self.pending_image is None:
+            return
+        self._collect_tiles()
+        path = self.pending_image
+        if path not in self.tile_sets:
+            job = self.image_jobs[path]
+            if not job.done():
+                return
+            del self.image_jobs[path]
+            print(f"Error loading image: {job.exception()}")
+            self.image_failures += 1
+            if self.image_failures >= len(self.available_images):
+                raise RuntimeError("None of the images could be loaded")
+            self.current_image_index = (self.current_image_index + 1) % len(self.available_images)
+            self.pending_image = self.available_images[self.current_image_index]
+            self._request_tiles(self.pending_image)
+            return
+
+        self.tile_sets.move_to_end(path)
+        self.board_surface, self.blurred_surface = self.tile_sets[path]
+        self.pending_image = None
+        self.image_failures = 0
+        self.full_redraw = True
+        # Reset and shuffle the puzzle
+        self._reset_puzzle()
+        self._shuffle_puzzle()
+        # Decode the next image ahead of time so Change Image is instant
+        self._request_tiles(self.available_images[(self.current_image_index + 1) % len(self.available_images)])
 
     def _create_initial_state(self):
-        state = np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)
-        for _ in range(1000):
-            self._make_random_move()
-        return state
-
-    def _make_random_move(self):
-        i, j = self.empty_pos
-        possible_moves = []
-        if i > 0:
-            possible_moves.append((i - 1, j))
-        if i < self.grid_size - 1:
-            possible_moves.append((i + 1, j))
-        if j > 0:
-            possible_moves.append((i, j - 1))
-        if j < self.grid_size - 1:
-            possible_moves.append((i, j + 1))
-
-        if possible_moves:
-            new_i, new_j = random.choice(possible_moves)
-            self._swap_pieces((i, j), (new_i, new_j))
-            self.empty_pos = (new_i, new_j)
+        """A uniformly random solvable board and the position of its empty space"""
+        state = PuzzleSolver.random_boards(self.grid_size, 1)[0].astype(int).reshape(self.grid_size, self.grid_size)
+        empty_pos = tuple(int(x) for x in np.argwhere(state == self.grid_size * self.grid_size - 1)[0])
+        return state, empty_pos
 
     def _swap_pieces(self, pos1, pos2):
         i1, j1 = pos1
         i2, j2 = pos2
+        self.misplaced -= self._is_misplaced(pos1) + self._is_misplaced(pos2)
         self.current_state[i1][j1], self.current_state[i2][j2] = self.current_state[i2][j2], self.current_state[i1][j1]
+        self.misplaced += self._is_misplaced(pos1) + self._is_misplaced(pos2)
 
-    def _create_blurred_piece(self):
-        last_piece = self.pieces[-1]
-        blurred = last_piece.filter(ImageFilter.GaussianBlur(radius=15))
-        blurred = blurred.filter(ImageFilter.GaussianBlur(radius=15))
-        return blurred
+    def _is_misplaced(self, pos):
+        i, j = pos
+        return int(self.current_state[i][j] != i * self.grid_size + j)
 
-    def draw(self):
-        self.screen.fill(self.colors['background'])
+    def _count_misplaced(self):
+        # Kept up to date by _swap_pieces afterwards, so checking for a win is free
+        self.misplaced = int(np.count_nonzero(self.current_state.ravel() != np.arange(self.current_state.size)))
 
-        puzzle_rect = pygame.Rect(self.padding, self.puzzle_top_padding, self.puzzle_width, self.puzzle_width)
-        pygame.draw.rect(self.screen, (100, 100, 100), puzzle_rect, 3)  # Thicker outer border
+    def _to_surface(self, piece):
+        surface = pygame.image.fromstring(piece.tobytes(), piece.size, piece.mode)
+        return surface.convert_alpha() if piece.mode == 'RGBA' else surface.convert()
 
-        # Draw grid lines
-        for i in range(1, self.grid_size):
-            # Vertical lines
-            pygame.draw.line(self.screen, (100, 100, 100),
-                             (self.padding + i * self.piece_size, self.puzzle_top_padding),
-                             (self.padding + i * self.piece_size, self.puzzle_top_padding + self.puzzle_width), 2)
-            # Horizontal lines
-            pygame.draw.line(self.screen, (100, 100, 100),
-                             (self.padding, self.puzzle_top_padding + i * self.piece_size),
-                             (self.padding + self.puzzle_width, self.puzzle_top_padding + i * self.piece_size), 2)
-
-        for i in range(self.grid_size):
-            for j in range(self.grid_size):
-                piece_index = self.current_state[i][j]
-                if piece_index != self.grid_size * self.grid_size - 1:
-                    piece = self.pieces[piece_index]
-                else:
-                    piece = self.blurred_piece
-                piece_surface = pygame.image.fromstring(piece.tobytes(), piece.size, piece.mode)
-
-                # Calculate piece position
-                piece_x = j * self.piece_size + self.padding
-                piece_y = i * self.piece_size + self.puzzle_top_padding
-
-                # Draw piece
-                self.screen.blit(piece_surface, (piece_x, piece_y))
+    def draw(self):
+        """Repaint only the regions that changed since the last frame and push just those to the display"""
+        if self.start_time is not None:  # Only update if timer is running
+            current_time = pygame.time.get_ticks()
+            self.elapsed_time = current_time - self.start_time
+        if not self.window_visible:
+            return
 
-                # Draw border around each piece
-                piece_rect = pygame.Rect(piece_x, piece_y, self.piece_size, self.piece_size)
-                pygame.draw.rect(self.screen, (150, 150, 150), piece_rect, 1)
+        dirty_rects = self._collect_damage()
+        if not dirty_rects:
+            return  # Nothing changed, so idle frames cost nothing
 
-        # Draw stats area with improved style
-        pygame.draw.rect(self.screen, self.colors['stats_bg'], self.stats_rect, border_radius=10)
-        pygame.draw.rect(self.screen, self.colors['border'], self.stats_rect, 2, border_radius=10)
+        if len(dirty_rects) == 1 and dirty_rects[0] == self.screen.get_rect():
+            self._paint()
+            pygame.display.flip()
+            return
 
+        for rect in dirty_rects:
+            self.screen.set_clip(rect)
+            self._paint()
+        self.screen.set_clip(None)
+        pygame.display.update(dirty_rects)
+
+    def _collect_damage(self):
+        """Compare what the next frame would show with the last painted one and return the rects to repaint"""
+        slide = self._playback_slide()
+        frame = {
+            'board': self.current_state.ravel().tolist(),
+            'slide': (slide, self.empty_pos, self._playback_progress()) if slide is not None else None,
+            'timer': self._timer_text(),
+            'moves': self.moves,
+            'buttons': [(self._button_text(button), button['hover']) for button in self.buttons],
+            'progress': self._progress_text(),
+            'progress_area': self._progress_layout()[1],
+            'message': (self.completion_message, self.completion_message.visible, self.completion_message.button_hover)
+                       if self.completion_message else None,
+        }
+        last, self._last_frame = self._last_frame, frame
+
+        # A new image, or a message box opening or closing, changes the whole window
+        if self.full_redraw or last is None or frame['message'] != last['message']:
+            self.full_redraw = False
+            return [self.screen.get_rect()]
+
+        dirty_rects = []
+        for pos, (old, new) in enumerate(zip(last['board'], frame['board'])):
+            if old != new:
+                dirty_rects.append(self._cell_rect(divmod(pos, self.grid_size)))
+        if frame['slide'] != last['slide']:
+            for slide in (last['slide'], frame['slide']):
+                if slide is not None:
+                    dirty_rects.append(self._cell_rect(slide[0]).union(self._cell_rect(slide[1])))
+        if frame['timer'] != last['timer']:
+            dirty_rects.append(self.timer_rect)
+        if frame['moves'] != last['moves']:
+            dirty_rects.append(self.moves_rect)
+        for button, old, new in zip(self.buttons, last['buttons'], frame['buttons']):
+            if old != new:
+                dirty_rects.append(button['rect'])
+        if frame['progress_area'] != last['progress_area'] or frame['progress'] != last['progress']:
+            # Both where the old line was and where the new one goes, as its width changes with the text
+            for area in (last['progress_area'], frame['progress_area']):
+                if area is not None:
+                    dirty_rects.append(area)
+        return dirty_rects
+
+    def _cell_rect(self, pos):
+        i, j = pos
+        # Grown a little to cover the grid lines and borders that straddle the cell edges
+        return pygame.Rect(self.padding + j * self.piece_size, self.puzzle_top_padding + i * self.piece_size,
+                           self.piece_size, self.piece_size).inflate(4, 4)
+
+    def _draw_piece_border(self, rect):
+        # Drawn as lines because a one pixel draw.rect outlines the clip area when it is partly clipped
+        corners = [rect.topleft, (rect.right - 1, rect.top), (rect.right - 1, rect.bottom - 1), (rect.left, rect.bottom - 1)]
+        pygame.draw.lines(self.screen, (150, 150, 150), True, corners)
+
+    def _timer_text(self):
+        return f"Time: {self.elapsed_time // 1000}.{(self.elapsed_time % 1000) // 100}s"
+
+    def _button_text(self, button):
+        # The running solver's button offers to cancel it
+        if button['action'] != self.solver_action:
+            return button['text']
+        # Stopping an anytime search early keeps the best solution it has found
+        if self.playback is not None:
+            return 'Stop search'
+        if self.search_progress is not None and self.search_progress[3] is not None:
+            return 'Use best'
+        return 'Cancel'
+
+
+    def _progress_text(self, compact=False):
+        if self.pending_image is not None:
+            return "Loading image..."
+        if self.solver_thread is None:
+            return None
+        if self.search_progress is None:
+            return "Searching..."
+        nodes, frontier, bound, best = self.search_progress
+        progress_text = f"Nodes: {nodes:,}" if compact else f"Nodes: {nodes:,}  Open: {frontier:,}"
+        if best is not None:
+            progress_text += f"  Best: {best}"
+        elif bound is not None:
+            progress_text += f"  f: {bound}"
+        return progress_text
+
+    def _progress_layout(self):
+        """The search progress line and the screen rect it covers, or (None, None) when there is none"""
+        progress_text = self._progress_text()
+        if progress_text is None:
+            return None, None
+        # Lines too wide for the panel drop the open list size rather than run into the puzzle's border
+        if self.font.size(progress_text)[0] > self.progress_rect.width:
+            progress_text = self._progress_text(compact=True)
+        progress_surface = self._text_surface('progress', self.font, progress_text, self.colors['algorithm'])
+        progress_rect = progress_surface.get_rect(midtop=(self.buttons[-1]['rect'].centerx,
+                                                          self.buttons[-1]['rect'].bottom + 10))
+        return progress_surface, progress_rect.clamp(self.progress_rect)
+
+    def _cached(self, key, build):
+        """Return a pre-rendered surface, building it on first use.
+
+        Keys carry every color and size the surface depends on, so changing either
+        simply renders a fresh one.
+        """
+        surface = self._chrome_cache.get(key)
+        if surface is None:
+            surface = build()
+            self._chrome_cache[key] = surface
+        return surface
+
+    def invalidate_chrome(self):
+        """Drop every pre-rendered surface, e.g. after editing self.colors or the layout"""
+        self._chrome_cache.clear()
+        self._text_cache.clear()
+        self.full_redraw = True
+
+    def _text_surface(self, role, font, text, color):
+        # One cached rendering per role, re-rendered only when its text changes
+        key = (text, color)
+        cached = self._text_cache.get(role)
+        if cached is None or cached[0] != key:
+            cached = (key, font.render(text, True, color))
+            self._text_cache[role] = cached
+        return cached[1]
+
+    def _stats_panel(self):
+        """The stats box and rainbow title as one surface, with the screen position to blit it at"""
+        title_surface = self._cached(('title', self.colors['stats_bg']), self._render_title)
+        title_rect = title_surface.get_rect(topleft=(self.stats_rect.centerx - self._title_width // 2,
+                                                     self.stats_rect.top + 20))
+        area = self.stats_rect.union(title_rect)
+
+        def build():
+            surface = pygame.Surface(area.size).convert()
+            surface.fill(self.colors['background'])
+            panel_rect = self.stats_rect.move(-area.left, -area.top)
+            pygame.draw.rect(surface, self.colors['stats_bg'], panel_rect, border_radius=10)
+            pygame.draw.rect(surface, self.colors['border'], panel_rect, 2, border_radius=10)
+            surface.blit(title_surface, title_rect.move(-area.left, -area.top))
+            return surface
+
+        key = ('stats_panel', area.topleft, area.size, self.colors['background'],
+               self.colors['stats_bg'], self.colors['border'])
+        return self._cached(key, build), area.topleft
+
+    def _render_title(self):
         # Draw title with colorful gradient and shadow effect
         title_text = "Photo Puzzler"
-        title_x = self.stats_rect.centerx
-        title_y = self.stats_rect.top + 20
         font = self.title_font
 
         # Define a gradient color palette (rainbow-like)
@@ -393,99 +642,178 @@ class PhotoPuzzle:
             surf = font.render(char, True, color)
             char_surfaces.append((surf, color))
             total_width += surf.get_width()
+        self._title_width = total_width
 
-        # Draw shadow
+        # Rendered onto the panel color so antialiased edges blend exactly as on screen
         shadow_offset = 3
-        x = title_x - total_width // 2
+        height = max(surf.get_height() for surf, _ in char_surfaces)
+        surface = pygame.Surface((total_width + shadow_offset, height + shadow_offset)).convert()
+        surface.fill(self.colors['stats_bg'])
+
+        # Draw shadow
+        x = 0
         for i, (surf, color) in enumerate(char_surfaces):
             char = title_text[i]
             shadow = font.render(char, True, (0, 0, 0))
-            self.screen.blit(shadow, (x + shadow_offset, title_y + shadow_offset))
+            surface.blit(shadow, (x + shadow_offset, shadow_offset))
             x += surf.get_width()
 
         # Draw gradient text
-        x = title_x - total_width // 2
+        x = 0
         for i, (surf, color) in enumerate(char_surfaces):
-            self.screen.blit(surf, (x, title_y))
+            surface.blit(surf, (x, 0))
             x += surf.get_width()
+        return surface
+
+    def _button_colors(self, button):
+        if button['action'] == 'shuffle':
+            return self.colors['shuffle_button'], self.colors['shuffle_button_hover']
+        elif button['action'] == 'reset':
+            return self.colors['reset_button'], self.colors['reset_button_hover']
+        elif button['action'] in ['bfs', 'dfs', 'astar']:
+            return self.colors['algorithm_button'], self.colors['algorithm_button_hover']
+        else:
+            return self.colors['exit_button'], self.colors['exit_button_hover']
+
+    def _button_surface(self, button):
+        """A button in its current hover state with its label, pre-rendered over the window background"""
+        base_color, hover_color = self._button_colors(button)
+        color = hover_color if button['hover'] else base_color
+        text = self._button_text(button)
+        size = button['rect'].size
+        key = ('button', size, color, text, self.colors['background'], self.colors['button_text'])
+        return self._cached(key, lambda: self._render_button(size, color, text))
+
+    def _render_button(self, size, color, text):
+        width, height = size
+        surface = pygame.Surface(size).convert()
+        surface.fill(self.colors['background'])
+
+        button_surface = pygame.Surface(size, pygame.SRCALPHA)
+        shadow_rect = pygame.Rect(2, 2, width, height)
+        pygame.draw.rect(button_surface, (0, 0, 0, 100), shadow_rect, border_radius=5)
 
-        # Update and draw timer
-        if self.start_time is not None:  # Only update if timer is running
-            current_time = pygame.time.get_ticks()
-            self.elapsed_time = current_time - self.start_time
+        # Create gradient effect
+        for y in range(height):
+            alpha = int(255 * (1 - y / height * 0.3))  # Fade to darker
+            gradient_color = (*color[:3], alpha)
+            pygame.draw.line(button_surface, gradient_color, (0, y), (width, y))
+
+        # Draw button border
+        pygame.draw.rect(button_surface, (*color[:3], 200), pygame.Rect(0, 0, width, height), border_radius=5)
+
+        # Draw button highlight
+        highlight_rect = pygame.Rect(0, 0, width, height // 3)
+        highlight_color = (*color[:3], 100)
+        pygame.draw.rect(button_surface, highlight_color, highlight_rect, border_radius=5)
+
+        surface.blit(button_surface, (0, 0))
+
+        # Draw button text with shadow
+        center = (width // 2, height // 2)
+        shadow_surface = self.font.render(text, True, (0, 0, 0, 150))
+        surface.blit(shadow_surface, shadow_surface.get_rect(center=(center[0] + 1, center[1] + 1)))
+        text_surface = self.font.render(text, True, self.colors['button_text'])
+        surface.blit(text_surface, text_surface.get_rect(center=center))
+        return surface
+
+    def _paint(self):
+        self.screen.fill(self.colors['background'])
+
+        puzzle_rect = pygame.Rect(self.padding, self.puzzle_top_padding, self.puzzle_width, self.puzzle_width)
+        pygame.draw.rect(self.screen, (100, 100, 100), puzzle_rect, 3)  # Thicker outer border
 
-        timer_text = f"Time: {self.elapsed_time // 1000}.{(self.elapsed_time % 1000) // 100}s"
-        timer_surface = self.timer_font.render(timer_text, True, self.colors['timer'])
+        # Draw grid lines
+        for i in range(1, self.grid_size):
+            # Vertical lines
+            pygame.draw.line(self.screen, (100, 100, 100),
+                             (self.padding + i * self.piece_size, self.puzzle_top_padding),
+                             (self.padding + i * self.piece_size, self.puzzle_top_padding + self.puzzle_width), 2)
+            # Horizontal lines
+            pygame.draw.line(self.screen, (100, 100, 100),
+                             (self.padding, self.puzzle_top_padding + i * self.piece_size),
+                             (self.padding + self.puzzle_width, self.puzzle_top_padding + i * self.piece_size), 2)
+
+        # The tile sliding into the empty space during playback is drawn last, part way along
+        sliding_pos = self._playback_slide()
+
+        # Every piece is a source rect of the one board surface, so the board is drawn in one call
+        blit_sequence = []
+        for i in range(self.grid_size):
+            for j in range(self.grid_size):
+                piece_index = self.current_state[i][j]
+                piece_pos = (j * self.piece_size + self.padding, i * self.piece_size + self.puzzle_top_padding)
+                if piece_index != self.grid_size * self.grid_size - 1 and (i, j) != sliding_pos:
+                    blit_sequence.append((self.board_surface, piece_pos, self.tile_rects[piece_index]))
+                else:
+                    blit_sequence.append((self.blurred_surface, piece_pos))
+        self.screen.blits(blit_sequence, doreturn=False)
+
+        # Draw border around each piece
+        for i in range(self.grid_size):
+            for j in range(self.grid_size):
+                self._draw_piece_border(pygame.Rect(j * self.piece_size + self.padding,
+                                                    i * self.piece_size + self.puzzle_top_padding,
+                                                    self.piece_size, self.piece_size))
+
+        if sliding_pos is not None:
+            i, j = sliding_pos
+            empty_i, empty_j = self.empty_pos
+            progress = self._playback_progress()
+            piece_x = (j + (empty_j - j) * progress) * self.piece_size + self.padding
+            piece_y = (i + (empty_i - i) * progress) * self.piece_size + self.puzzle_top_padding
+            self.screen.blit(self.board_surface, (round(piece_x), round(piece_y)),
+                             self.tile_rects[self.current_state[i][j]])
+            self._draw_piece_border(pygame.Rect(round(piece_x), round(piece_y), self.piece_size, self.piece_size))
+
+        # Draw stats area and title, pre-rendered once
+        panel_surface, panel_pos = self._stats_panel()
+        self.screen.blit(panel_surface, panel_pos)
+
+        # Draw timer
+        timer_surface = self._text_surface('timer', self.timer_font, self._timer_text(), self.colors['timer'])
         timer_rect = timer_surface.get_rect(midtop=(self.stats_rect.centerx, self.stats_rect.top + 80))
         self.screen.blit(timer_surface, timer_rect)
 
         # Draw moves counter 
-        moves_text = f"Moves: {self.moves}"
-        moves_surface = self.stats_font.render(moves_text, True, self.colors['moves'])
+        moves_surface = self._text_surface('moves', self.stats_font, f"Moves: {self.moves}", self.colors['moves'])
         moves_rect = moves_surface.get_rect(midtop=(self.stats_rect.centerx, self.stats_rect.top + 120))
         self.screen.blit(moves_surface, moves_rect)
 
         # Draw buttons
         for button in self.buttons:
-            if button['action'] == 'shuffle':
-                base_color = self.colors['shuffle_button']
-                hover_color = self.colors['shuffle_button_hover']
-            elif button['action'] == 'reset':
-                base_color = self.colors['reset_button']
-                hover_color = self.colors['reset_button_hover']
-            elif button['action'] in ['bfs', 'dfs', 'astar']:
-                base_color = self.colors['algorithm_button']
-                hover_color = self.colors['algorithm_button_hover']
-            else:  
-                base_color = self.colors['exit_button']
-                hover_color = self.colors['exit_button_hover']
-
-            button_surface = pygame.Surface((button['rect'].width, button['rect'].height), pygame.SRCALPHA)
-            shadow_rect = pygame.Rect(2, 2, button['rect'].width, button['rect'].height)
-            pygame.draw.rect(button_surface, (0, 0, 0, 100), shadow_rect, border_radius=5)
-
-            color = hover_color if button['hover'] else base_color
-            # Create gradient effect
-            for y in range(button['rect'].height):
-                alpha = int(255 * (1 - y / button['rect'].height * 0.3))  # Fade to darker
-                gradient_color = (*color[:3], alpha)
-                pygame.draw.line(button_surface, gradient_color, (0, y), (button['rect'].width, y))
-
-            # Draw button border
-            pygame.draw.rect(button_surface, (*color[:3], 200),
-                             pygame.Rect(0, 0, button['rect'].width, button['rect'].height),
-                             border_radius=5)
-
-            # Draw button highlight
-            highlight_rect = pygame.Rect(0, 0, button['rect'].width, button['rect'].height // 3)
-            highlight_color = (*color[:3], 100)
-            pygame.draw.rect(button_surface, highlight_color, highlight_rect, border_radius=5)
-
-            # Blit button surface to screen
-            self.screen.blit(button_surface, button['rect'])
-
-            # Draw button text with shadow
-            text = button['text']
-            # Draw text shadow
-            shadow_surface = self.font.render(text, True, (0, 0, 0, 150))
-            shadow_rect = shadow_surface.get_rect(center=(button['rect'].centerx + 1, button['rect'].centery + 1))
-            self.screen.blit(shadow_surface, shadow_rect)
-
-            # Draw main text
-            text_surface = self.font.render(text, True, self.colors['button_text'])
-            text_rect = text_surface.get_rect(center=button['rect'].center)
-            self.screen.blit(text_surface, text_rect)
+            self.screen.blit(self._button_surface(button), button['rect'])
+
+        # Draw search progress under the buttons while a solver runs
+        progress_surface, progress_rect = self._progress_layout()
+        if progress_surface is not None:
+            self.screen.blit(progress_surface, progress_rect)
 
         # Draw completion message if it exists
         if self.completion_message:
             self.completion_message.draw()
 
-        pygame.display.flip()
+    def handle_motion(self, pos):
+        for button in self.buttons:
+            button['hover'] = button['rect'].collidepoint(pos)
 
     def handle_click(self, pos):
+        x, y = pos
+        if self.solver_thread is not None:
+            # While a search runs, its button doubles as Cancel and only Exit stays live
+            for button in self.buttons:
+                if button['rect'].collidepoint(x, y):
+                    if button['action'] == self.solver_action:
+                        self.cancel_requested.set()
+                    elif button['action'] == 'exit':
+                        self.cancel_requested.set()
+                        return 'exit'
+            return
         if self.solving:
             return
-        x, y = pos
+        # The board is reset and shuffled when a new image arrives, so until then
+        # only Change Image and Exit respond
+        loading = self.pending_image is not None
 
         # Update button hover states
         for button in self.buttons:
@@ -494,6 +822,8 @@ class PhotoPuzzle:
         # Check if a button was clicked
         for button in self.buttons:
             if button['rect'].collidepoint(x, y):
+                if loading and button['action'] not in ('change_image', 'exit'):
+                    return
                 if button['action'] == 'change_image':
                     self.change_image()
                 elif button['action'] == 'shuffle':
@@ -501,18 +831,29 @@ class PhotoPuzzle:
                 elif button['action'] == 'reset':
                     self._reset_puzzle()
                 elif button['action'] == 'bfs':
-                    self.solve_bfs()
-                    self.execute_solution()
+                    # Small boards read the same shortest solution off the exhaustive distance table
+                    if self.grid_size <= PuzzleSolver.DISTANCE_TABLE_MAX_GRID:
+                        self.start_solver('bfs', self.solve_table)
+                    else:
+                        self.start_solver('bfs', self.solve_bfs)
                 elif button['action'] == 'dfs':
-                    self.solve_dfs()
-                    self.execute_solution()
+                    self.start_solver('dfs', self.solve_dfs)
                 elif button['action'] == 'astar':
-                    self.solve_astar()
-                    self.execute_solution()
+                    # The A* open list outgrows memory on larger boards, so switch to IDA*,
+                    # or give up on optimality where even that takes too long
+                    if self.grid_size >= ANYTIME_MIN_GRID:
+                        self.start_solver('astar', self.solve_anytime)
+                    elif self.grid_size > 3:
+                        self.start_solver('astar', self.solve_idastar)
+                    else:
+                        self.start_solver('astar', self.solve_astar)
                 elif button['action'] == 'exit':
                     return 'exit'
                 return
 
+        if loading:
+            return
+
         # Handle puzzle piece movement (only in puzzle area)
         if (self.padding <= x < self.puzzle_width + self.padding and
                 self.padding <= y < self.puzzle_width + self.padding):
@@ -529,11 +870,97 @@ class PhotoPuzzle:
                 self.empty_pos = (clicked_i, clicked_j)
                 self.moves += 1
 
+    def start_solver(self, action, solver):
+        """Run a solver on a background thread so the window keeps handling events"""
+        self.solving = True
+        self.solver_action = action
+        self.search_progress = None
+        self.search_start = (self.current_state.copy(), self.empty_pos, self.moves)
+        self.offered_solution = None
+        self.cancel_requested.clear()
+        self.solver_thread = threading.Thread(target=solver, daemon=True)
+        self.solver_thread.start()
+
+    def update(self):
+        """Show a newly loaded image, start playback once the background search has finished, then advance it"""
+        self._poll_image()
+        finished = self.solver_thread is not None and not self.solver_thread.is_alive()
+        # An anytime search hands over each shorter solution while it runs, so playback starts
+        # with the first one and restarts whenever a shorter one turns up
+        offered, self.offered_solution = self.offered_solution, None
+        if offered is not None:
+            self._replay_from_start(offered)
+        if finished:
+            self.solver_thread = None
+            self.solver_action = None
+            self.search_progress = None
+            if self.playback is None and self.solving:
+                self.execute_solution()
+
+        if self.playback is not None and self.playback['paused_at'] is None:
+            duration = self.playback_speeds[self.playback_speed]
+            now = pygame.time.get_ticks()
+            while self.playback['next'] is not None and now - self.playback['started'] >= duration:
+                self._play_next_move()
+                self.playback['started'] += duration
+            if self.playback['next'] is None:
+                self._finish_playback()
+
+    def handle_key(self, key):
+        """Playback controls: Space pauses, Right steps, Enter skips to the end, Up/Down change speed"""
+        if self.playback is None:
+            return
+        now = pygame.time.get_ticks()
+        if key == pygame.K_SPACE:
+            if self.playback['paused_at'] is None:
+                self.playback['paused_at'] = now
+            else:
+                self.playback['started'] += now - self.playback['paused_at']
+                self.playback['paused_at'] = None
+        elif key == pygame.K_RIGHT:
+            self.playback['paused_at'] = now
+            self.playback['started'] = now
+            self._play_next_move()
+            if self.playback['next'] is None:
+                self._finish_playback()
+        elif key in (pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_END):
+            while self.playback['next'] is not None:
+                self._play_next_move()
+            self._finish_playback()
+        elif key in (pygame.K_UP, pygame.K_DOWN):
+            step = -1 if key == pygame.K_UP else 1
+            self.playback_speed = min(max(self.playback_speed + step, 0), len(self.playback_speeds) - 1)
+            # Restart the current slide so it does not jump at the new speed
+            self.playback['started'] = now
+            if self.playback['paused_at'] is not None:
+                self.playback['paused_at'] = now
+
+    def _offer_solution(self, path):
+        """Called on the search thread with each shorter solution an anytime search finds"""
+        self.offered_solution = path
+
+    def _replay_from_start(self, path):
+        """Play a solution from the board the search started on, replacing any longer one already playing"""
+        if not self.solving:
+            return  # The last solution has already played out, or the search failed
+        paused = self.playback is not None and self.playback['paused_at'] is not None
+        state, self.empty_pos, self.moves = self.search_start
+        self.current_state = state.copy()
+        self._count_misplaced()
+        self.solution_path = path
+        self.execute_solution()
+        if paused and self.playback is not None:
+            self.playback['paused_at'] = self.playback['started']
+
+    def _report_progress(self, stats):
+        """Publish search progress for the stats panel and stop the search if Cancel was pressed"""
+        self.search_progress = (stats.nodes, stats.frontier, stats.bound, stats.best)
+        if self.cancel_requested.is_set():
+            raise SearchCancelled()
+
     def _shuffle_puzzle(self):
-        self.current_state = np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)
-        self.empty_pos = (self.grid_size - 1, self.grid_size - 1)
-        for _ in range(1000):
-            self._make_random_move()
+        self.current_state, self.empty_pos = self._create_initial_state()
+        self._count_misplaced()
         self.moves = 0
         self.start_time = None
         self.elapsed_time = 0
@@ -541,243 +968,197 @@ class PhotoPuzzle:
     def _reset_puzzle(self):
         self.current_state = np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)
         self.empty_pos = (self.grid_size - 1, self.grid_size - 1)
+        self._count_misplaced()
         self.moves = 0
         self.start_time = None
         self.elapsed_time = 0
 
     def is_solved(self):
-        solved_state = np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)
-        return np.array_equal(self.current_state, solved_state)
-
-    def solve_bfs(self):
-        """Solve the puzzle using BFS"""
+        return self.misplaced == 0
+
+    def is_animating(self):
+        """Whether a tile is sliding, so the main loop should draw at ANIMATION_FPS"""
+        return self.playback is not None and self.playback['paused_at'] is None
+
+    def idle_timeout(self):
+        """Milliseconds the main loop may sleep waiting for events, or 0 to sleep until the next one"""
+        timeouts = []
+        if self.solver_thread is not None or self.pending_image is not None:
+            timeouts.append(POLL_INTERVAL)
+        # The timer shows tenths of a second, so wake for the next one unless nobody can see it
+        if self.start_time is not None and self.window_visible:
+            timeouts.append(100 - (pygame.time.get_ticks() - self.start_time) % 100)
+        return min(timeouts, default=0)
+
+    def _run_search(self, algorithm, name, search):
+        """Run one of PuzzleSolver's searches on the current board and keep the moves it finds"""
         try:
             self.solving = True
-            self.current_algorithm = 'bfs'  # Store current algorithm
+            self.current_algorithm = algorithm  # Store current algorithm
             if self.start_time is None:  # Start timer if not already started
                 self.start_time = pygame.time.get_ticks()
-            initial_state = self.current_state.copy()
-            empty_pos = self.empty_pos
-
-            queue = deque([(initial_state, empty_pos, [])])
-            visited = set()
-
-            while queue:
-                current_state, current_empty, path = queue.popleft()
-
-                if np.array_equal(current_state,
-                                  np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)):
-                    self.solution_path = path
-                    return True
-
-                state_hash = tuple(current_state.flatten())
-                if state_hash in visited:
-                    continue
-
-                visited.add(state_hash)
-
-                i, j = current_empty
-                for di, dj in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    new_i, new_j = i + di, j + dj
-                    if 0 <= new_i < self.grid_size and 0 <= new_j < self.grid_size:
-                        new_state = current_state.copy()
-                        new_state[i][j], new_state[new_i][new_j] = new_state[new_i][new_j], new_state[i][j]
-                        new_path = path + [(new_i, new_j)]
-                        queue.append((new_state, (new_i, new_j), new_path))
-
+            # Shortest solutions are remembered, so asking again for a board seen before is instant
+            cacheable = algorithm in PuzzleSolver.OPTIMAL_ALGORITHMS
+            solution = self.solution_cache.lookup(self.current_state) if cacheable else None
+            if solution is None:
+                solution = search(self.current_state, self.empty_pos, stats=SearchStats(self._report_progress))
+                if solution is not None and cacheable:
+                    self.solution_cache.store(self.current_state, solution)
+            if solution is None:
+                print(f"{name} could not find a solution")
+                return False
+            self.solution_path = solution
+            return True
+        except UnsolvableBoard as e:
+            print(e)
+            self.solving = False
+            return False
+        except SearchCancelled:
+            print(f"{name} search cancelled")
+            self.solving = False
             return False
         except Exception as e:
-            print(f"Error in BFS: {e}")
+            print(f"Error in {name}: {e}")
             self.solving = False
             return False
 
+    def solve_bfs(self, bidirectional=True):
+        """Solve the puzzle using BFS, searching from both ends unless bidirectional is False"""
+        return self._run_search('bfs', "BFS", lambda tiles, empty_pos, stats:
+                                PuzzleSolver.solve_bfs(tiles, empty_pos, bidirectional, stats))
+
     def solve_dfs(self):
         """Solve the puzzle using DFS with depth limit"""
-        try:
-            self.solving = True
-            self.current_algorithm = 'dfs'  # Store current algorithm
-            if self.start_time is None:  # Start timer if not already started
-                self.start_time = pygame.time.get_ticks()
-            initial_state = self.current_state.copy()
-            empty_pos = self.empty_pos
-
-            # Set a reasonable depth limit to prevent stack overflow
-            max_depth = 70
-            visited = set()
-
-            def dfs_helper(current_state, current_empty, path, depth):
-                if depth > max_depth:
-                    return None
-
-                if np.array_equal(current_state,
-                                  np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)):
-                    return path
-
-                state_hash = tuple(current_state.flatten())
-                if state_hash in visited:
-                    return None
-
-                visited.add(state_hash)
-
-                i, j = current_empty
-                for di, dj in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    new_i, new_j = i + di, j + dj
-                    if 0 <= new_i < self.grid_size and 0 <= new_j < self.grid_size:
-                        new_state = current_state.copy()
-                        new_state[i][j], new_state[new_i][new_j] = new_state[new_i][new_j], new_state[i][j]
-                        new_path = path + [(new_i, new_j)]
-                        result = dfs_helper(new_state, (new_i, new_j), new_path, depth + 1)
-                        if result is not None:
-                            return result
-
-                return None
-
-            solution = dfs_helper(initial_state, empty_pos, [], 0)
-            if solution is not None:
-                self.solution_path = solution
-                return True
-            else:
-                print("DFS could not find a solution within the depth limit")
-                return False
-
-        except Exception as e:
-            print(f"Error in DFS: {e}")
-            self.solving = False
-            return False
+        return self._run_search('dfs', "DFS", PuzzleSolver.solve_dfs)
 
     def solve_astar(self):
         """Solve the puzzle using A* algorithm"""
-        try:
-            self.solving = True
-            self.current_algorithm = 'astar'  # Store current algorithm
-            if self.start_time is None:  # Start timer if not already started
-                self.start_time = pygame.time.get_ticks()
-            initial_state = self.current_state.copy()
-            empty_pos = self.empty_pos
-
-            def heuristic(state):
-                # Manhattan distance heuristic
-                total = 0
-                for i in range(self.grid_size):
-                    for j in range(self.grid_size):
-                        value = state[i][j]
-                        if value != self.grid_size * self.grid_size - 1:  # Skip empty tile
-                            goal_i = value // self.grid_size
-                            goal_j = value % self.grid_size
-                            total += abs(i - goal_i) + abs(j - goal_j)
-                return total
-
-            queue = PriorityQueue()
-            queue.put((0, 0, initial_state, empty_pos, []))
-            visited = set()
-            counter = 1
-
-            while not queue.empty():
-                _, _, current_state, current_empty, path = queue.get()
-
-                if np.array_equal(current_state,
-                                  np.arange(self.grid_size * self.grid_size).reshape(self.grid_size, self.grid_size)):
-                    self.solution_path = path
-                    return True
-
-                state_hash = tuple(current_state.flatten())
-                if state_hash in visited:
-                    continue
-
-                visited.add(state_hash)
-
-                i, j = current_empty
-                for di, dj in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    new_i, new_j = i + di, j + dj
-                    if 0 <= new_i < self.grid_size and 0 <= new_j < self.grid_size:
-                        new_state = current_state.copy()
-                        new_state[i][j], new_state[new_i][new_j] = new_state[new_i][new_j], new_state[i][j]
-                        new_path = path + [(new_i, new_j)]
-                        priority = len(new_path) + heuristic(new_state)
-                        queue.put((priority, counter, new_state, (new_i, new_j), new_path))
-                        counter += 1
+        return self._run_search('astar', "A*", PuzzleSolver.solve_astar)
 
-            return False
-        except Exception as e:
-            print(f"Error in A*: {e}")
-            self.solving = False
-            return False
+    def solve_idastar(self):
+        """Solve the puzzle using IDA* with pattern databases or Manhattan distance plus linear conflict"""
+        return self._run_search('idastar', "IDA*", PuzzleSolver.solve_idastar)
 
-    def execute_solution(self):
-        """Execute the found solution step by step"""
-        try:
-            if not self.solution_path:
-                self.solving = False
-                return
+    def solve_anytime(self):
+        """Solve the puzzle with weighted A*, handing each shorter solution to playback until the time budget runs out"""
+        return self._run_search('anytime', "Weighted A*", lambda tiles, empty_pos, stats:
+                                PuzzleSolver.solve_anytime(tiles, empty_pos, stats, budget=PuzzleSolver.ANYTIME_BUDGET,
+                                                           on_solution=self._offer_solution))
 
-            for move in self.solution_path:
-                if not self.solving:  # Allow interruption
-                    break
-                self._swap_pieces(self.empty_pos, move)
-                self.empty_pos = move
-                self.moves += 1  # Increment moves counter
-                self.draw()  # This will update the timer
-                pygame.time.delay(500)  # Delay between moves for visualization
-                pygame.event.pump()  # Keep the window responsive
-
-            # Stop the timer but keep the final time
-            if self.solving:  # Only if we completed the solution (not interrupted)
-                final_time = self.elapsed_time
-                self.start_time = None
-                self.elapsed_time = final_time  # Keep the final time
-                # Create completion message
-                algorithm_name = "BFS" if self.current_algorithm == 'bfs' else \
-                               "DFS" if self.current_algorithm == 'dfs' else "A*"
-                message = f"{algorithm_name} solved the puzzle in {self.moves} moves and {self.elapsed_time/1000:.1f} seconds!"
-                self.completion_message = MessageBox(self.screen, message)
-                print(f"Created completion message: {message}")  # Debug print
+    def solve_table(self):
+        """Solve the puzzle by descending the exhaustive distance table of a 3x3 board"""
+        return self._run_search('table', "Distance table", PuzzleSolver.solve_table)
 
+    def execute_solution(self):
+        """Start playing back the found solution, one animated move at a time"""
+        # Playback pulls moves from an iterator and only looks one move ahead
+        moves = iter(self.solution_path)
+        first = next(moves, None)
+        if first is None:
             self.solving = False
-            self.solution_path = []
-        except Exception as e:
-            print(f"Error executing solution: {e}")
-            self.solving = False
-            self.solution_path = []
-            final_time = self.elapsed_time
-            self.start_time = None
-            self.elapsed_time = final_time  # Keep the final time
+            return
+        self.playback = {'moves': moves, 'next': first, 'started': pygame.time.get_ticks(), 'paused_at': None}
+
+    def _play_next_move(self):
+        move = self.playback['next']
+        self._swap_pieces(self.empty_pos, move)
+        self.empty_pos = move
+        self.moves += 1  # Increment moves counter
+        self.playback['next'] = next(self.playback['moves'], None)
+
+    def _playback_slide(self):
+        """Position of the tile currently sliding into the empty space, or None"""
+        if self.playback is None or self.playback_speeds[self.playback_speed] == 0:
+            return None
+        return self.playback['next']
+
+    def _playback_progress(self):
+        """How far the sliding tile has travelled, eased to slow down as it arrives"""
+        now = self.playback['paused_at']
+        if now is None:
+            now = pygame.time.get_ticks()
+        elapsed = now - self.playback['started']
+        progress = min(max(elapsed / self.playback_speeds[self.playback_speed], 0), 1)
+        return 1 - (1 - progress) ** 2
+
+    def _finish_playback(self):
+        # Stop the timer but keep the final time
+        final_time = self.elapsed_time
+        self.start_time = None
+        self.elapsed_time = final_time  # Keep the final time
+        # Create completion message
+        algorithm_name = "BFS" if self.current_algorithm == 'bfs' else \
+                       "DFS" if self.current_algorithm == 'dfs' else \
+                       "IDA*" if self.current_algorithm == 'idastar' else \
+                       "The distance table" if self.current_algorithm == 'table' else \
+                       "Weighted A*" if self.current_algorithm == 'anytime' else "A*"
+        message = f"{algorithm_name} solved the puzzle in {self.moves} moves and {self.elapsed_time/1000:.1f} seconds!"
+        self.completion_message = MessageBox(self.screen, message)
+        print(f"Created completion message: {message}")  # Debug print
+
+        self.playback = None
+        self.solving = False
+        self.solution_path = []
+        # An anytime search may still be looking for a shorter solution than the one just played
+        self.cancel_requested.set()
 
 
 def main():
     puzzle = PhotoPuzzle()
     running = True
     was_solved = False
-    message_box = None
+    clock = pygame.time.Clock()
 
     while running:
-        for event in pygame.event.get():
+        if puzzle.is_animating():
+            clock.tick(ANIMATION_FPS)
+            events = pygame.event.get()
+        else:
+            # Sleep until there is input, or until the timer or a background job needs a look
+            event = pygame.event.wait(puzzle.idle_timeout())
+            events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+
+        for event in events:
             if event.type == pygame.QUIT:
+                puzzle.cancel_requested.set()
                 running = False
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                if message_box and message_box.handle_click(event.pos):
-                    message_box = None
-                elif puzzle.completion_message and puzzle.completion_message.handle_click(event.pos):
+                if puzzle.completion_message and puzzle.completion_message.handle_click(event.pos):
                     puzzle.completion_message = None
                 else:
                     result = puzzle.handle_click(event.pos)
                     if result == 'exit':
                         running = False
-
-        puzzle.draw()
+            elif event.type == pygame.MOUSEMOTION:
+                if puzzle.completion_message:
+                    puzzle.completion_message.handle_motion(event.pos)
+                puzzle.handle_motion(event.pos)
+            elif event.type == pygame.KEYDOWN:
+                puzzle.handle_key(event.key)
+            elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+                puzzle.window_visible = False
+            elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWEXPOSED):
+                puzzle.window_visible = True
+                puzzle.full_redraw = True
+
+        puzzle.update()
 
         current_state = puzzle.is_solved()
         if current_state and puzzle.moves > 0 and not was_solved:
-            message = f"Puzzle solved in {puzzle.moves} moves!"
-            message_box = MessageBox(puzzle.screen, message)
+            # Drawn by the puzzle so damage tracking repaints it; a solver's own message wins
+            if puzzle.completion_message is None:
+                message = f"Puzzle solved in {puzzle.moves} moves!"
+                puzzle.completion_message = MessageBox(puzzle.screen, message)
             was_solved = True
         elif not current_state:
             was_solved = False
 
-        if message_box:
-            message_box.draw()
-
-        pygame.time.delay(50)
+        puzzle.draw()
 
+    # Drop queued decodes rather than waiting for them on the way out
+    for job in puzzle.image_jobs.values():
+        job.cancel()
+    puzzle.image_loader.shutdown(wait=False)
     pygame.quit()
 
 
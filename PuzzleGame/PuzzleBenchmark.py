@@ -0,0 +1,173 @@
+"""Benchmarks for the solvers in PuzzleSolver, on seeded and therefore repeatable boards.
+
+    python PuzzleBenchmark.py --output results.json
+    python PuzzleBenchmark.py --baseline benchmark_baseline.json
+
+Each case solves the same few boards with one algorithm and reports wall time, nodes
+expanded, nodes per second, peak RSS and solution lengths as JSON. Every case runs in a
+fresh process so its peak RSS is its own. Given a baseline, cases that got slower or
+expanded more nodes by more than the tolerance, or whose solutions changed length, are
+listed and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import PuzzleSolver
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# (algorithm, grid size, difficulty). Difficulty is the exact distance from the goal on
+# grids with a distance table, and the length of the scrambling walk on larger ones.
+BENCHMARK_CASES = [
+    ('bfs', 3, 20), ('bfs', 3, 28),
+    ('dfs', 3, 10), ('dfs', 3, 20),
+    ('astar', 3, 20), ('astar', 3, 26),
+    ('idastar', 3, 20), ('idastar', 3, 28),
+    ('table', 3, 20), ('table', 3, 31),
+    ('astar', 4, 20),
+    ('idastar', 4, 40), ('idastar', 4, 60),
+    ('idastar', 5, 30),
+    ('anytime', 5, 30), ('anytime', 5, 60),
+]
+BOARDS_PER_CASE = 5
+DEFAULT_TOLERANCE = 0.25
+# Cases faster than this are mostly timer noise, so their time is only compared above it
+MIN_COMPARED_SECONDS = 0.05
+
+
+def case_name(algorithm, grid_size, difficulty):
+    return f"{algorithm}-{grid_size}x{grid_size}-{difficulty}"
+
+
+def case_boards(grid_size, difficulty, count, seed=0):
+    """The boards every algorithm is timed on for one grid size and difficulty"""
+    rng = np.random.default_rng([seed, grid_size, difficulty])
+    if PuzzleSolver.DistanceTable.get(grid_size) is not None:
+        return PuzzleSolver.random_boards(grid_size, count, distance=difficulty, rng=rng)
+    return PuzzleSolver.random_walks(grid_size, count, difficulty, rng)
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _run_case(algorithm, grid_size, boards):
+    # Map the heuristic tables before the clock starts, they are built ahead of time by the parent
+    PuzzleSolver.PatternDatabase.get(grid_size)
+    PuzzleSolver.DistanceTable.get(grid_size)
+
+    seconds = 0.0
+    nodes = 0
+    lengths = []
+    for tiles in boards:
+        stats = PuzzleSolver.SearchStats()
+        start = time.perf_counter()
+        # Without a budget the anytime search stops only once its solution is proven shortest,
+        # so its nodes and lengths repeat from run to run
+        path = PuzzleSolver.solve(tiles, algorithm, stats=stats, budget=None)
+        seconds += time.perf_counter() - start
+        nodes += stats.nodes
+        lengths.append(None if path is None else len(path))
+    return {
+        'seconds': round(seconds, 6),
+        'nodes': nodes,
+        'nodes_per_second': round(nodes / seconds) if seconds else None,
+        'peak_rss_kb': _peak_rss_kb(),
+        'solution_lengths': lengths,
+    }
+
+
+def run_benchmarks(cases=BENCHMARK_CASES, boards_per_case=BOARDS_PER_CASE, seed=0, log=None):
+    """Run each case in its own process and return the JSON-ready report"""
+    results = []
+    for algorithm, grid_size, difficulty in cases:
+        name = case_name(algorithm, grid_size, difficulty)
+        # Building a missing table here keeps it out of the case's time
+        boards = case_boards(grid_size, difficulty, boards_per_case, seed)
+        PuzzleSolver.PatternDatabase.get(grid_size)
+        with ProcessPoolExecutor(1) as executor:
+            result = executor.submit(_run_case, algorithm, grid_size, boards.tolist()).result()
+        result = {'name': name, 'algorithm': algorithm, 'grid_size': grid_size, 'difficulty': difficulty,
+                  'boards': len(boards), **result}
+        results.append(result)
+        if log is not None:
+            log(f"{name:<20} {result['seconds']:>10.4f}s {result['nodes']:>12} nodes "
+                f"{result['nodes_per_second'] or 0:>10} nodes/s")
+    return {
+        'seed': seed,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': results,
+    }
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Describe each case that regressed against the baseline report"""
+    previous = {case['name']: case for case in baseline['cases']}
+    regressions = []
+    for case in report['cases']:
+        old = previous.get(case['name'])
+        # Cases new since the baseline, or run on a different number of boards, have nothing to compare to
+        if old is None or old['boards'] != case['boards']:
+            continue
+        if case['solution_lengths'] != old['solution_lengths']:
+            regressions.append(f"{case['name']}: solution lengths changed from {old['solution_lengths']} "
+                               f"to {case['solution_lengths']}")
+        if case['nodes'] > old['nodes'] * (1 + tolerance):
+            regressions.append(f"{case['name']}: {case['nodes']} nodes, baseline {old['nodes']}")
+        if case['seconds'] > max(old['seconds'], MIN_COMPARED_SECONDS) * (1 + tolerance):
+            regressions.append(f"{case['name']}: {case['seconds']:.4f}s, baseline {old['seconds']:.4f}s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the puzzle solvers on seeded boards.")
+    parser.add_argument('-o', '--output', help="write the JSON report to this file instead of stdout")
+    parser.add_argument('--baseline', help="report to compare against; regressions make the exit status 1")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"fraction by which time or nodes may exceed the baseline (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument('--boards', type=int, default=BOARDS_PER_CASE, help="boards solved per case")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the boards")
+    parser.add_argument('-k', '--cases', help="only run cases whose name contains this text, e.g. 4x4")
+    args = parser.parse_args(argv)
+
+    cases = [case for case in BENCHMARK_CASES if args.cases is None or args.cases in case_name(*case)]
+    report = run_benchmarks(cases, args.boards, args.seed, log=lambda line: print(line, file=sys.stderr))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('seed') != report['seed']:
+            print("Baseline was run with a different seed, so its boards differ", file=sys.stderr)
+            return 1
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against the baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
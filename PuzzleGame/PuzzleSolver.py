@@ -0,0 +1,1603 @@
+"""Board model and search engines for the sliding puzzle, usable without pygame.
+
+Run it directly to solve boards from a file or stdin, one board per line:
+
+    python PuzzleSolver.py boards.txt --algorithm astar
+
+Each board lists its tiles row by row, numbered from 0 with the blank as the highest
+number, e.g. "0 1 2 3 4 5 6 8 7". One JSON object is written per board.
+"""
+import argparse
+import heapq
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Disjoint tile groups for the additive pattern databases. The blank is the last tile
+# and belongs to no group.
+PATTERN_PARTITIONS = {
+    4: [(0, 1, 2, 4, 5, 6), (8, 9, 10, 12, 13, 14), (3, 7, 11)],
+    5: [(0, 1, 2, 5, 6), (3, 4, 7, 8, 9), (10, 11, 12, 15, 16), (13, 14, 17, 18, 19), (20, 21, 22, 23)],
+}
+PATTERN_DB_DIR = os.path.join(os.path.expanduser("~"), ".cache", "photopuzzler")
+PATTERN_DB_MAGIC = b'PPDB'
+PATTERN_DB_VERSION = 1
+
+# Grids small enough for DistanceTable to hold the exact distance of every board
+DISTANCE_TABLE_MAX_GRID = 3
+DISTANCE_TABLE_MAGIC = b'PPDT'
+DISTANCE_TABLE_VERSION = 1
+
+SOLUTION_CACHE_PATH = os.path.join(PATTERN_DB_DIR, "solutions.sqlite")
+# Boards kept in memory by a SolutionCache before the least recently used are dropped
+SOLUTION_CACHE_CAPACITY = 200000
+
+# Searches whose solutions are shortest ones, and so worth caching
+OPTIMAL_ALGORITHMS = ['bfs', 'astar', 'idastar']
+
+# Solvers publish progress, and can be cancelled, once per this many expanded nodes
+PROGRESS_INTERVAL = 1024
+
+# Batches of random walks random_boards tries before giving up on a target distance
+RANDOM_WALK_ROUNDS = 100
+
+# Function calls a SearchProfiler keeps for its trace, so long searches stay loadable
+PROFILE_MAX_EVENTS = 500000
+# Which functions' time SearchProfiler.phases counts towards each phase
+PROFILE_PHASES = {
+    'heuristic': {'BoardCodec.manhattan', 'BoardCodec.row_conflict', 'BoardCodec.column_conflict',
+                  'BoardCodec.linear_conflict', 'PatternDatabase.heuristic', 'DistanceTable.distance'},
+    'open list': {'OpenList.push', 'OpenList.pop', 'deque.append', 'deque.popleft'},
+    'state': {'BoardCodec.move_blank', 'BoardCodec.pack', 'BoardCodec.blank_position'},
+}
+
+# Heuristic weights of solve_anytime's successive passes, ending with plain A*
+ANYTIME_WEIGHTS = [5, 3, 2, 1.5, 1.25, 1]
+# Seconds solve_anytime looks for shorter solutions when run through solve
+ANYTIME_BUDGET = 10
+
+# Depth limit of the depth-first search
+DFS_MAX_DEPTH = 70
+# States whose depth the depth-first search remembers per pass; beyond this it only prunes less
+DFS_TABLE_CAPACITY = 2000000
+
+ALGORITHMS = ['auto', 'bfs', 'dfs', 'astar', 'idastar', 'anytime', 'table']
+
+
+class SearchCancelled(Exception):
+    """Raised from a progress callback to stop a running search"""
+
+
+class UnsolvableBoard(ValueError):
+    """The board cannot reach the goal, or cannot within the search's depth limit"""
+
+
+class SearchStats:
+    """Counters a solver keeps up to date while it runs.
+
+    nodes counts expansions and max_frontier is the largest frontier seen at a progress
+    report. With detailed=True solvers also count children generated, duplicates pruned
+    and heuristic evaluations. Searches that can work those out from their own
+    bookkeeping always fill them in; the rest need one extra branch per expansion, so
+    it is off by default. progress, if given, is called with the stats every
+    PROGRESS_INTERVAL expansions and may raise SearchCancelled to stop the search.
+    """
+    def __init__(self, progress=None, detailed=False):
+        self.progress = progress
+        self.detailed = detailed
+        self.nodes = 0
+        self.frontier = 0
+        self.bound = None
+        self.max_frontier = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.heuristic_calls = 0
+        self.seconds = 0.0
+        self.best = None  # length of the best solution an anytime search has found so far
+
+    def report(self, nodes, frontier, bound=None):
+        self.nodes = nodes
+        self.frontier = frontier
+        self.bound = bound
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if self.progress is not None:
+            self.progress(self)
+
+    def count(self, nodes, frontier=0, generated=0, duplicates=0, heuristic_calls=0):
+        """Record a finished search's totals"""
+        self.nodes = nodes
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        self.generated = generated
+        self.duplicates = duplicates
+        self.heuristic_calls = heuristic_calls
+
+    def as_dict(self):
+        counters = {'nodes': self.nodes, 'max_frontier': self.max_frontier, 'seconds': round(self.seconds, 6)}
+        if self.generated:
+            counters.update(generated=self.generated, duplicates=self.duplicates,
+                            heuristic_calls=self.heuristic_calls)
+        return counters
+
+
+class SearchProfiler:
+    """Times every function a search calls, to see where a slow solve spends its time.
+
+    Use it as a context manager around the solve, on the thread running it. It works
+    through a profile hook, which slows the search several times over, so the solvers
+    themselves carry no timing code. totals() and phases() summarise the calls, and
+    write_trace saves them as a Chrome trace for chrome://tracing, Perfetto or speedscope.
+    """
+    def __init__(self, max_events=PROFILE_MAX_EVENTS):
+        self.max_events = max_events
+        self.events = []
+        self.calls = {}  # function name -> [calls, inclusive seconds]
+        self._stack = []
+        self._start = time.perf_counter()
+
+    def __enter__(self):
+        # Calls still open when the last search ended never see their return event
+        self._stack = []
+        sys.setprofile(self._hook)
+        return self
+
+    def __exit__(self, *exc_info):
+        sys.setprofile(None)
+        return False
+
+    def _hook(self, frame, event, arg):
+        now = time.perf_counter()
+        if event == 'call':
+            self._stack.append((self._function_name(frame), now))
+        elif event == 'c_call':
+            self._stack.append((getattr(arg, '__qualname__', arg.__name__), now))
+        elif self._stack and event in ('return', 'c_return', 'c_exception'):
+            name, start = self._stack.pop()
+            calls = self.calls.setdefault(name, [0, 0.0])
+            calls[0] += 1
+            calls[1] += now - start
+            if len(self.events) < self.max_events:
+                self.events.append({'name': name, 'ph': 'X', 'pid': 0, 'tid': 0,
+                                    'ts': (start - self._start) * 1e6, 'dur': (now - start) * 1e6})
+
+    @staticmethod
+    def _function_name(frame):
+        code = frame.f_code
+        # co_qualname is new in Python 3.11; before it, methods are named after the class of self
+        if hasattr(code, 'co_qualname'):
+            return code.co_qualname
+        owner = frame.f_locals.get('self')
+        return code.co_name if owner is None else f"{type(owner).__name__}.{code.co_name}"
+
+    def totals(self):
+        """Calls and inclusive seconds per function, slowest first"""
+        return dict(sorted(((name, tuple(calls)) for name, calls in self.calls.items()),
+                           key=lambda item: -item[1][1]))
+
+    def phases(self):
+        """Inclusive seconds spent on heuristics, the open list and state updates"""
+        phases = {}
+        for name, (_, seconds) in self.calls.items():
+            for phase, names in PROFILE_PHASES.items():
+                if name in names:
+                    phases[phase] = phases.get(phase, 0.0) + seconds
+        return phases
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+class OpenList:
+    """Priority queue of search nodes, one bucket per priority with a heap of the priorities in use.
+
+    Priorities in the solvers are small integers, so the heap stays a few dozen entries
+    long however many nodes are queued, and pushing to an existing bucket is a plain list
+    append. The newest node of the lowest priority comes out first, which among nodes of
+    equal f favours the deepest. Only one thread uses it, so unlike queue.PriorityQueue
+    it takes no locks.
+    """
+    def __init__(self):
+        self.buckets = {}
+        self.priorities = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, priority, node):
+        bucket = self.buckets.get(priority)
+        if bucket is None:
+            bucket = self.buckets[priority] = []
+            heapq.heappush(self.priorities, priority)
+        bucket.append(node)
+        self.size += 1
+
+    def pop(self):
+        """Remove and return (priority, node) with the lowest priority"""
+        priority = self.priorities[0]
+        bucket = self.buckets[priority]
+        node = bucket.pop()
+        if not bucket:
+            heapq.heappop(self.priorities)
+            del self.buckets[priority]
+        self.size -= 1
+        return priority, node
+
+
+class BoardCodec:
+    """Packs a board into a single int so solvers can hash and copy states cheaply.
+
+    Tile values are stored `bits` bits apiece with board position 0 in the lowest
+    bits. The blank is the tile numbered grid_size * grid_size - 1.
+    """
+    _codecs = {}
+
+    @classmethod
+    def get(cls, grid_size):
+        """Shared codec per grid size, so its memoised heuristic tables are reused between searches"""
+        if grid_size not in cls._codecs:
+            cls._codecs[grid_size] = cls(grid_size)
+        return cls._codecs[grid_size]
+
+    def __init__(self, grid_size):
+        self.grid_size = grid_size
+        self.size = grid_size * grid_size
+        self.blank = self.size - 1
+        self.bits = max(4, (self.size - 1).bit_length())
+        self.mask = (1 << self.bits) - 1
+        self.shifts = [pos * self.bits for pos in range(self.size)]
+        self.coords = [divmod(pos, grid_size) for pos in range(self.size)]
+        self.goal = self.pack(range(self.size))
+
+        # Positions the blank can move to from each position, in the order the solvers expand them
+        self.moves = []
+        for i, j in self.coords:
+            targets = []
+            for di, dj in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+                new_i, new_j = i + di, j + dj
+                if 0 <= new_i < grid_size and 0 <= new_j < grid_size:
+                    targets.append(new_i * grid_size + new_j)
+            self.moves.append(tuple(targets))
+
+        # Manhattan distance of every tile from every position to its goal position
+        self.distance = [[abs(i - tile // grid_size) + abs(j - tile % grid_size) for i, j in self.coords]
+                         for tile in range(self.size)]
+        self.distance[self.blank] = [0] * self.size
+        # Where each position lands when the board is mirrored in its main diagonal
+        self.mirror = [j * grid_size + i for i, j in self.coords]
+        # Conflict penalties are memoised per line, keyed by the tiles currently in it
+        self._row_conflicts = [{} for _ in range(grid_size)]
+        self._column_conflicts = [{} for _ in range(grid_size)]
+
+    def pack(self, tiles):
+        state = 0
+        for shift, tile in zip(self.shifts, np.asarray(tiles).ravel()):
+            state |= int(tile) << shift
+        return state
+
+    def unpack(self, state):
+        tiles = [(state >> shift) & self.mask for shift in self.shifts]
+        return np.array(tiles).reshape(self.grid_size, self.grid_size)
+
+    def to_bytes(self, state):
+        return state.to_bytes((self.bits * self.size + 7) // 8, 'little')
+
+    def transpose(self, state):
+        """The board mirrored in its main diagonal, with tiles renumbered so the goal maps to itself"""
+        mirrored = 0
+        for pos, shift in enumerate(self.shifts):
+            tile = (state >> shift) & self.mask
+            mirrored |= self.mirror[tile] << self.shifts[self.mirror[pos]]
+        return mirrored
+
+    def tile_at(self, state, pos):
+        return (state >> self.shifts[pos]) & self.mask
+
+    def blank_position(self, state):
+        for pos, shift in enumerate(self.shifts):
+            if (state >> shift) & self.mask == self.blank:
+                return pos
+        return None
+
+    def is_solvable(self, state):
+        """True if state holds every tile exactly once and can be slid back to the goal"""
+        tiles = [(state >> shift) & self.mask for shift in self.shifts]
+        if sorted(tiles) != list(range(self.size)):
+            return False
+
+        # Each move is a transposition with the blank, so the permutation parity has to
+        # match the parity of the blank's distance from its goal corner
+        seen = [False] * self.size
+        transpositions = 0
+        for start in range(self.size):
+            if seen[start]:
+                continue
+            pos = start
+            length = 0
+            while not seen[pos]:
+                seen[pos] = True
+                pos = tiles[pos]
+                length += 1
+            transpositions += length - 1
+        i, j = self.coords[tiles.index(self.blank)]
+        blank_distance = (self.grid_size - 1 - i) + (self.grid_size - 1 - j)
+        return transpositions % 2 == blank_distance % 2
+
+    def move_blank(self, state, empty, target):
+        """Return the state reached by sliding the tile at `target` into the blank at `empty`"""
+        tile = (state >> self.shifts[target]) & self.mask
+        delta = tile - self.blank
+        return state + (delta << self.shifts[empty]) - (delta << self.shifts[target])
+
+    def position(self, pos):
+        i, j = pos
+        return i * self.grid_size + j
+
+    def manhattan(self, state):
+        total = 0
+        for pos, shift in enumerate(self.shifts):
+            total += self.distance[(state >> shift) & self.mask][pos]
+        return total
+
+    def row_conflict(self, tiles, row):
+        """Linear conflict penalty for one row of a flat tile list"""
+        start = row * self.grid_size
+        line = tuple(tiles[start:start + self.grid_size])
+        penalty = self._row_conflicts[row].get(line)
+        if penalty is None:
+            n = self.grid_size
+            penalty = self._line_conflict([tile % n for tile in line if tile != self.blank and tile // n == row])
+            self._row_conflicts[row][line] = penalty
+        return penalty
+
+    def column_conflict(self, tiles, column):
+        """Linear conflict penalty for one column of a flat tile list"""
+        line = tuple(tiles[column::self.grid_size])
+        penalty = self._column_conflicts[column].get(line)
+        if penalty is None:
+            n = self.grid_size
+            penalty = self._line_conflict([tile // n for tile in line if tile != self.blank and tile % n == column])
+            self._column_conflicts[column][line] = penalty
+        return penalty
+
+    def _line_conflict(self, goals):
+        # Two extra moves for every tile that must leave the line so the rest are in goal order
+        longest = []
+        for k, goal in enumerate(goals):
+            longest.append(1 + max([longest[m] for m in range(k) if goals[m] < goal], default=0))
+        return 2 * (len(goals) - max(longest, default=0))
+
+    def linear_conflict(self, tiles):
+        """Manhattan distance plus linear conflict for a flat tile list"""
+        total = sum(self.distance[tile][pos] for pos, tile in enumerate(tiles))
+        for line in range(self.grid_size):
+            total += self.row_conflict(tiles, line) + self.column_conflict(tiles, line)
+        return total
+
+
+class PatternDatabase:
+    """Disjoint additive pattern databases for one grid size, memory-mapped from an on-disk cache.
+
+    Each table holds the number of moves of its own tiles needed to bring them home,
+    indexed by the tile positions in mixed radix: the i-th tile's position times
+    (grid_size ** 2) ** i. Moving one tile therefore shifts one index by a constant.
+    """
+    _loaded = {}
+
+    @classmethod
+    def get(cls, grid_size):
+        """Return the databases for grid_size, building them on first use, or None if there are none"""
+        if grid_size not in PATTERN_PARTITIONS:
+            return None
+        if grid_size not in cls._loaded:
+            cls._loaded[grid_size] = cls(grid_size)
+        return cls._loaded[grid_size]
+
+    def __init__(self, grid_size, cache_dir=PATTERN_DB_DIR):
+        self.grid_size = grid_size
+        self.size = grid_size * grid_size
+        self.patterns = PATTERN_PARTITIONS[grid_size]
+        self.path = os.path.join(cache_dir, f"pattern_db_{grid_size}x{grid_size}.bin")
+
+        # For every tile, which table it belongs to and what one step of its position is worth there
+        self.owner = [None] * self.size
+        for number, pattern in enumerate(self.patterns):
+            for slot, tile in enumerate(pattern):
+                self.owner[tile] = (number, self.size ** slot)
+
+        if not self._load():
+            self._build()
+            if not self._load():
+                raise RuntimeError(f"Could not load pattern databases from {self.path}")
+
+    def _header(self):
+        header = PATTERN_DB_MAGIC + struct.pack('<HHH', PATTERN_DB_VERSION, self.grid_size, len(self.patterns))
+        for pattern in self.patterns:
+            header += struct.pack('<H', len(pattern)) + bytes(pattern)
+        return header
+
+    def _load(self):
+        header = self._header()
+        try:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        expected = len(header) + sum(self.size ** len(pattern) for pattern in self.patterns)
+        if len(self._mmap) != expected or self._mmap[:len(header)] != header:
+            # Written by another version or for other partitions, so it gets rebuilt
+            self._mmap.close()
+            return False
+
+        view = memoryview(self._mmap)
+        self.tables = []
+        offset = len(header)
+        for pattern in self.patterns:
+            length = self.size ** len(pattern)
+            self.tables.append(view[offset:offset + length])
+            offset += length
+        return True
+
+    def _build(self):
+        print(f"Building pattern databases for {self.grid_size}x{self.grid_size} grid...", file=sys.stderr)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(self._header())
+            for pattern in self.patterns:
+                f.write(self._build_table(pattern).tobytes())
+        os.replace(temp_path, self.path)
+
+    def _build_table(self, pattern):
+        """Backward breadth-first search from the goal over placements of the pattern's tiles"""
+        n = self.grid_size
+        size = self.size
+        tiles = len(pattern)
+        radix = size ** np.arange(tiles, dtype=np.int64)
+        neighbors = np.full((size, 4), -1, dtype=np.int64)
+        for pos in range(size):
+            i, j = divmod(pos, n)
+            for d, (di, dj) in enumerate([(0, 1), (1, 0), (0, -1), (-1, 0)]):
+                if 0 <= i + di < n and 0 <= j + dj < n:
+                    neighbors[pos, d] = pos + di * n + dj
+
+        # Every tile's goal position is its own number
+        table = np.full(size ** tiles, 255, dtype=np.uint8)
+        frontier = np.array([int(np.dot(pattern, radix))], dtype=np.int64)
+        table[frontier] = 0
+        depth = 0
+        while frontier.size:
+            positions = frontier[:, None] // radix % size
+            occupied = np.bitwise_or.reduce(np.int64(1) << positions, axis=1)
+            for slot in range(tiles):
+                for d in range(4):
+                    target = neighbors[positions[:, slot], d]
+                    # The blank is left out of the abstraction, so a tile may step onto any cell its
+                    # pattern mates do not occupy
+                    free = (target >= 0) & ((occupied >> np.maximum(target, 0)) & 1 == 0)
+                    child = frontier[free] + (target[free] - positions[free, slot]) * radix[slot]
+                    table[child[table[child] == 255]] = depth + 1
+            depth += 1
+            frontier = np.flatnonzero(table == depth)
+        return table
+
+    def indices(self, tiles):
+        """Per-table indices for a flat tile list"""
+        indices = [0] * len(self.patterns)
+        for pos, tile in enumerate(tiles):
+            if self.owner[tile] is not None:
+                number, step = self.owner[tile]
+                indices[number] += pos * step
+        return indices
+
+    def heuristic(self, indices):
+        return sum(table[index] for table, index in zip(self.tables, indices))
+
+
+class DistanceTable:
+    """Exact distance to the goal of every solvable board, for grids small enough to enumerate.
+
+    Boards are ranked by the tiles everywhere but the top-left and bottom-right
+    corners, read as a mixed-radix Lehmer code. Swapping the two corner tiles flips the
+    permutation parity without changing the parity of the blank's distance home, so
+    only one of their orders is solvable and a 3x3 table has exactly 9! / 2 = 181,440
+    one-byte entries. It is built by one backward breadth-first search and
+    memory-mapped from the on-disk cache.
+    """
+    _loaded = {}
+
+    @classmethod
+    def get(cls, grid_size):
+        """Return the table for grid_size, building it on first use, or None if the grid is too large"""
+        if grid_size > DISTANCE_TABLE_MAX_GRID:
+            return None
+        if grid_size not in cls._loaded:
+            cls._loaded[grid_size] = cls(grid_size)
+        return cls._loaded[grid_size]
+
+    def __init__(self, grid_size, cache_dir=PATTERN_DB_DIR):
+        self.codec = BoardCodec.get(grid_size)
+        self.length = math.factorial(self.codec.size) // 2
+        # Shifts of the positions that make up the rank, leaving out the two corners
+        self.shifts = self.codec.shifts[1:-1]
+        self.path = os.path.join(cache_dir, f"distance_table_{grid_size}x{grid_size}.bin")
+        if not self._load():
+            self._build()
+            if not self._load():
+                raise RuntimeError(f"Could not load distance table from {self.path}")
+
+    def _header(self):
+        return DISTANCE_TABLE_MAGIC + struct.pack('<HH', DISTANCE_TABLE_VERSION, self.codec.grid_size)
+
+    def _load(self):
+        header = self._header()
+        try:
+            with open(self.path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        if len(self._mmap) != len(header) + self.length or self._mmap[:len(header)] != header:
+            self._mmap.close()
+            return False
+        self.table = memoryview(self._mmap)[len(header):]
+        return True
+
+    def _build(self):
+        print(f"Building distance table for {self.codec.grid_size}x{self.codec.grid_size} grid...", file=sys.stderr)
+        codec = self.codec
+        table = bytearray(b'\xff') * self.length
+        table[self.rank(codec.goal)] = 0
+        layer = [(codec.goal, codec.size - 1)]
+        depth = 0
+        while layer:
+            depth += 1
+            next_layer = []
+            for state, empty in layer:
+                for target in codec.moves[empty]:
+                    new_state = codec.move_blank(state, empty, target)
+                    rank = self.rank(new_state)
+                    if table[rank] == 255:
+                        table[rank] = depth
+                        next_layer.append((new_state, target))
+            layer = next_layer
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(self._header())
+            f.write(table)
+        os.replace(temp_path, self.path)
+
+    def rank(self, state):
+        """Index of a solvable state in the table"""
+        codec = self.codec
+        mask = codec.mask
+        rank = 0
+        used = 0
+        radix = codec.size
+        for shift in self.shifts:
+            tile = (state >> shift) & mask
+            # Lehmer digit: how many of the tiles not yet placed are smaller than this one
+            rank = rank * radix + tile - bin(used & ((1 << tile) - 1)).count('1')
+            used |= 1 << tile
+            radix -= 1
+        return rank
+
+    def distance(self, state):
+        return self.table[self.rank(state)]
+
+
+class SolutionCache:
+    """Optimal solutions already found, kept in memory and optionally in an sqlite file.
+
+    Every state along a stored solution is recorded with the blank's next move and its
+    distance to the goal, so a later lookup for any of them follows the chain instead of
+    searching. Boards are keyed by the smaller of their packed state and its mirror image
+    in the main diagonal, which maps the goal to itself.
+    """
+    def __init__(self, path=None, capacity=SOLUTION_CACHE_CAPACITY):
+        # (grid_size, canonical state) -> (blank's next position, moves left), least recently used first
+        self.entries = OrderedDict()
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("CREATE TABLE IF NOT EXISTS solutions (grid_size INTEGER, state BLOB, "
+                                 "next INTEGER, distance INTEGER, PRIMARY KEY (grid_size, state))")
+                self._db.commit()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not open solution cache {path}, keeping solutions in memory only: {e}", file=sys.stderr)
+                self._db = None
+
+    @staticmethod
+    def _codec(tiles):
+        tiles = np.asarray(tiles)
+        grid_size = math.isqrt(tiles.size)
+        if grid_size < 2 or grid_size * grid_size != tiles.size:
+            return None
+        return BoardCodec.get(grid_size)
+
+    def _canonical(self, codec, state):
+        """Canonical state and whether it is the mirrored one"""
+        mirrored = codec.transpose(state)
+        if mirrored < state:
+            return mirrored, True
+        return state, False
+
+    def _get(self, codec, state):
+        canonical, mirrored = self._canonical(codec, state)
+        key = (codec.grid_size, canonical)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        elif self._db is not None:
+            row = self._db.execute("SELECT next, distance FROM solutions WHERE grid_size = ? AND state = ?",
+                                   (codec.grid_size, codec.to_bytes(canonical))).fetchone()
+            if row is None:
+                return None
+            entry = row
+            self._remember(key, entry)
+        else:
+            return None
+        target, distance = entry
+        if mirrored:
+            target = codec.mirror[target]
+        return target, distance
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def lookup(self, tiles):
+        """The blank's moves solving tiles, or None if the board has not been solved before"""
+        codec = self._codec(tiles)
+        if codec is None:
+            return None
+        state = codec.pack(tiles)
+        if not codec.is_solvable(state):
+            return None
+        empty = codec.blank_position(state)
+        if state == codec.goal:
+            return []
+
+        with self._lock:
+            path = []
+            expected = None
+            while state != codec.goal:
+                entry = self._get(codec, state)
+                if entry is None:
+                    return None
+                target, distance = entry
+                # A chain that does not count down by one per move is stale, so search again
+                if (expected is not None and distance != expected) or target not in codec.moves[empty]:
+                    return None
+                path.append(codec.coords[target])
+                state = codec.move_blank(state, empty, target)
+                empty = target
+                expected = distance - 1
+            return path
+
+    def store(self, tiles, path):
+        """Record an optimal solution for tiles and for every board along it"""
+        codec = self._codec(tiles)
+        if codec is None:
+            return
+        state = codec.pack(tiles)
+        empty = codec.blank_position(state)
+
+        with self._lock:
+            rows = []
+            for step, move in enumerate(path):
+                target = codec.position(move)
+                canonical, mirrored = self._canonical(codec, state)
+                entry = (codec.mirror[target] if mirrored else target, len(path) - step)
+                self._remember((codec.grid_size, canonical), entry)
+                rows.append((codec.grid_size, codec.to_bytes(canonical)) + entry)
+                state = codec.move_blank(state, empty, target)
+                empty = target
+
+            if self._db is not None and rows:
+                try:
+                    with self._db:
+                        self._db.executemany("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)", rows)
+                except sqlite3.Error as e:
+                    print(f"Could not save solution to cache: {e}", file=sys.stderr)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def _prepare(tiles, empty_pos=None, max_depth=None):
+    """Pack a board for searching, raising UnsolvableBoard before any node is expanded if that is hopeless"""
+    tiles = np.asarray(tiles)
+    grid_size = math.isqrt(tiles.size)
+    if grid_size < 2 or grid_size * grid_size != tiles.size:
+        raise UnsolvableBoard(f"A board needs a square number of tiles, got {tiles.size}")
+    codec = BoardCodec.get(grid_size)
+    if tiles.min() < 0 or tiles.max() > codec.blank:
+        raise UnsolvableBoard("This arrangement of pieces cannot be solved")
+    state = codec.pack(tiles)
+    empty = codec.blank_position(state)
+
+    if empty_pos is not None and codec.position(empty_pos) != empty:
+        raise UnsolvableBoard("The empty space is not where the puzzle expects it, so the board cannot be solved")
+    if not codec.is_solvable(state):
+        raise UnsolvableBoard("This arrangement of pieces cannot be solved")
+    # Manhattan distance is a lower bound on the number of moves still needed
+    if max_depth is not None and codec.manhattan(state) > max_depth:
+        raise UnsolvableBoard(f"This board needs more than {max_depth} moves, beyond the search depth limit")
+    return codec, state, empty
+
+
+def solve(tiles, algorithm='auto', empty_pos=None, stats=None, cache=None, budget=ANYTIME_BUDGET):
+    """Solve a board with the named algorithm, returning the blank's moves or None.
+
+    'auto' reads 3x3 and smaller boards off the distance table and uses IDA* on
+    larger ones, where the A* open list outgrows memory. Given a SolutionCache,
+    optimal searches answer from it when they can and record what they find.
+    budget is the seconds 'anytime' spends improving its solution, or None to run
+    until that solution is proven shortest.
+    """
+    if algorithm == 'auto':
+        algorithm = 'table' if np.asarray(tiles).size <= DISTANCE_TABLE_MAX_GRID ** 2 else 'idastar'
+    if cache is not None and algorithm in OPTIMAL_ALGORITHMS:
+        path = cache.lookup(tiles)
+        if path is not None:
+            return path
+
+    solvers = {'bfs': solve_bfs, 'dfs': solve_dfs, 'astar': solve_astar, 'idastar': solve_idastar,
+               'anytime': lambda tiles, empty_pos, stats: solve_anytime(tiles, empty_pos, stats, budget),
+               'table': solve_table}
+    start = time.perf_counter()
+    path = solvers[algorithm](tiles, empty_pos, stats=stats)
+    if stats is not None:
+        stats.seconds = time.perf_counter() - start
+    if cache is not None and algorithm in OPTIMAL_ALGORITHMS and path is not None:
+        cache.store(tiles, path)
+    return path
+
+
+def solve_bfs(tiles, empty_pos=None, bidirectional=True, stats=None):
+    """Solve a board using BFS, searching from both ends unless bidirectional is False.
+
+    Returns the positions the blank moves to, in order, or None if there is no solution.
+    """
+    codec, initial_state, empty_pos = _prepare(tiles, empty_pos)
+    if stats is None:
+        stats = SearchStats()
+
+    if bidirectional:
+        return _bidirectional_bfs(codec, initial_state, empty_pos, stats)
+
+    # Each state maps to the one it was reached from, so the solution is rebuilt once at the end
+    queue = deque([(initial_state, empty_pos)])
+    parents = {initial_state: None}
+    nodes = 0
+    detailed = stats.detailed
+    generated = 0
+
+    while queue:
+        current_state, current_empty = queue.popleft()
+        nodes += 1
+        if nodes % PROGRESS_INTERVAL == 0:
+            stats.report(nodes, len(queue))
+
+        if current_state == codec.goal:
+            stats.count(nodes, len(queue), generated, generated - len(parents) + 1 if detailed else 0)
+            return _path_to(codec, parents, current_state)
+
+        if detailed:
+            generated += len(codec.moves[current_empty])
+        for new_empty in codec.moves[current_empty]:
+            new_state = codec.move_blank(current_state, current_empty, new_empty)
+            if new_state not in parents:
+                parents[new_state] = current_state
+                queue.append((new_state, new_empty))
+
+    stats.count(nodes, len(queue), generated, generated - len(parents) + 1 if detailed else 0)
+    return None
+
+
+def _ancestors(parents, state):
+    """state followed by each of its ancestors in a parent map, up to the root"""
+    while state is not None:
+        yield state
+        state = parents[state]
+
+
+def _path_to(codec, parents, state):
+    """The blank's moves from the root of a parent map to state"""
+    path = [codec.coords[codec.blank_position(ancestor)] for ancestor in _ancestors(parents, state)]
+    path.pop()  # the root's blank is where the solution starts, not a move
+    path.reverse()
+    return path
+
+
+def _bidirectional_bfs(codec, initial_state, empty_pos, stats):
+    """Breadth-first search from the start and the goal at once, returning the blank's moves or None.
+
+    Each side keeps a map from state to the neighbouring state it was reached from and
+    expands one whole layer at a time, always the smaller one. Children are checked
+    against the other side's map as they are generated, so the first meeting is on a
+    shortest path.
+    """
+    if initial_state == codec.goal:
+        return []
+
+    forward = {initial_state: None}
+    backward = {codec.goal: None}
+    forward_layer = [(initial_state, empty_pos)]
+    backward_layer = [(codec.goal, codec.size - 1)]
+    meeting = None
+    nodes = 0
+    detailed = stats.detailed
+    generated = 0
+
+    while forward_layer and backward_layer and meeting is None:
+        if len(forward_layer) <= len(backward_layer):
+            layer, parents, others = forward_layer, forward, backward
+        else:
+            layer, parents, others = backward_layer, backward, forward
+
+        next_layer = []
+        for state, empty in layer:
+            nodes += 1
+            if nodes % PROGRESS_INTERVAL == 0:
+                stats.report(nodes, len(layer) + len(next_layer))
+            if detailed:
+                generated += len(codec.moves[empty])
+            for new_empty in codec.moves[empty]:
+                new_state = codec.move_blank(state, empty, new_empty)
+                if new_state in parents:
+                    continue
+                parents[new_state] = state
+                if new_state in others:
+                    meeting = new_state
+                    break
+                next_layer.append((new_state, new_empty))
+            if meeting is not None:
+                break
+
+        if parents is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    duplicates = generated - len(forward) - len(backward) + 2 if detailed else 0
+    stats.count(nodes, len(forward_layer) + len(backward_layer), generated, duplicates)
+    if meeting is None:
+        return None
+
+    # Walk both parent chains out from the meeting point; the backward one already runs towards the goal
+    path = _path_to(codec, forward, meeting)
+    path.extend(codec.coords[codec.blank_position(state)] for state in _ancestors(backward, backward[meeting]))
+    return path
+
+
+def solve_dfs(tiles, empty_pos=None, max_depth=DFS_MAX_DEPTH, stats=None):
+    """Solve a board using iterative deepening DFS, returning the blank's moves or None.
+
+    Each pass is a depth-first search to a deeper limit, up to max_depth, so the first
+    solution found is a shortest one. Every move changes the parity of the blank's
+    distance from its goal corner, so the limit grows by two moves at a time. Within a
+    pass, a transposition table keeps the shallowest depth each state was reached at,
+    and a state is only searched again when reached in fewer moves. The search runs
+    on an explicit stack, so deep limits do not run into Python's recursion limit.
+    """
+    codec, initial_state, empty_pos = _prepare(tiles, empty_pos, max_depth)
+    if stats is None:
+        stats = SearchStats()
+    if initial_state == codec.goal:
+        stats.count(0)
+        return []
+    nodes = 0
+    detailed = stats.detailed
+    generated = 0
+    duplicates = 0
+    max_frontier = 0
+
+    goal_i, goal_j = codec.coords[codec.blank_position(codec.goal)]
+    empty_i, empty_j = codec.coords[empty_pos]
+    first_limit = abs(goal_i - empty_i) + abs(goal_j - empty_j)
+    for limit in range(first_limit or 2, max_depth + 1, 2):
+        depths = {initial_state: 0}
+        # One entry per move on the current path: the state and the moves of the blank not yet tried
+        stack = [(initial_state, empty_pos, iter(codec.moves[empty_pos]))]
+        path = []
+        while stack:
+            current_state, current_empty, remaining = stack[-1]
+            new_empty = next(remaining, None)
+            if new_empty is None:
+                stack.pop()
+                if path:
+                    path.pop()
+                continue
+
+            depth = len(stack)
+            new_state = codec.move_blank(current_state, current_empty, new_empty)
+            if detailed:
+                generated += 1
+            if new_state == codec.goal:
+                path.append(codec.coords[new_empty])
+                stats.count(nodes, max(max_frontier, depth), generated, duplicates)
+                return path
+            if depth == limit:
+                continue
+            seen = depths.get(new_state)
+            if seen is not None and seen <= depth:
+                if detailed:
+                    duplicates += 1
+                continue
+            if seen is not None or len(depths) < DFS_TABLE_CAPACITY:
+                depths[new_state] = depth
+
+            nodes += 1
+            if nodes % PROGRESS_INTERVAL == 0:
+                stats.report(nodes, depth, limit)
+            path.append(codec.coords[new_empty])
+            stack.append((new_state, new_empty, iter(codec.moves[new_empty])))
+            max_frontier = max(max_frontier, len(stack))
+
+    stats.count(nodes, max_frontier, generated, duplicates)
+    return None
+
+
+def solve_astar(tiles, empty_pos=None, stats=None):
+    """Solve a board using A* with the Manhattan distance heuristic, returning the blank's moves or None.
+
+    The best known g of every state is kept, so a child is only queued when it improves
+    on it and queued entries that have since been improved on are skipped when popped.
+    """
+    codec, initial_state, empty_pos = _prepare(tiles, empty_pos)
+    if stats is None:
+        stats = SearchStats()
+
+    open_list = OpenList()
+    open_list.push(codec.manhattan(initial_state), (0, initial_state, empty_pos))
+    best_g = {initial_state: 0}
+    parents = {initial_state: None}
+    nodes = 0
+    pushes = 1
+    pruned = 0
+    stale = 0
+
+    while open_list:
+        f, (g, current_state, current_empty) = open_list.pop()
+        if g > best_g[current_state]:
+            stale += 1
+            continue
+
+        if current_state == codec.goal:
+            stats.count(nodes, len(open_list), pushes - 1 + pruned, pruned + stale, pushes)
+            return _path_to(codec, parents, current_state)
+
+        nodes += 1
+        if nodes % PROGRESS_INTERVAL == 0:
+            stats.report(nodes, len(open_list), f)
+
+        new_g = g + 1
+        for new_empty in codec.moves[current_empty]:
+            new_state = codec.move_blank(current_state, current_empty, new_empty)
+            if new_g >= best_g.get(new_state, new_g + 1):
+                pruned += 1
+                continue
+            best_g[new_state] = new_g
+            parents[new_state] = current_state
+            # Manhattan distance heuristic
+            open_list.push(new_g + codec.manhattan(new_state), (new_g, new_state, new_empty))
+            pushes += 1
+
+    stats.count(nodes, 0, pushes - 1 + pruned, pruned + stale, pushes)
+    return None
+
+
+def solve_anytime(tiles, empty_pos=None, stats=None, budget=None, weights=ANYTIME_WEIGHTS, on_solution=None):
+    """Solve a board with weighted A* passes of decreasing weight, returning the shortest moves found.
+
+    h is the pattern databases where the grid has them, which are never below Manhattan
+    distance, and Manhattan distance otherwise. Both are updated per move.
+    A pass with weight w orders nodes by g + w * h, which finds a solution quickly but
+    one up to w times longer than the shortest. Every pass prunes nodes that cannot beat
+    the best solution so far, so a pass that runs out of nodes proves that solution
+    optimal. on_solution, if given, is called with each shorter solution as it is found,
+    and stats.best holds its length. Once budget seconds have passed, or the search is
+    cancelled through stats, the best solution so far is returned; until there is one
+    the search carries on, or is cancelled.
+    """
+    codec, initial_state, empty_pos = _prepare(tiles, empty_pos)
+    if stats is None:
+        stats = SearchStats()
+    deadline = None if budget is None else time.perf_counter() + budget
+    distance = codec.distance
+    best = None
+    nodes = 0
+
+    # Nodes carry their pattern database indices, or None on grids that only use Manhattan distance
+    database = PatternDatabase.get(codec.grid_size)
+    if database is not None:
+        owner = database.owner
+        tables = database.tables
+        start_indices = tuple(database.indices(codec.unpack(initial_state).ravel().tolist()))
+        start_h = database.heuristic(start_indices)
+    else:
+        start_indices = None
+        start_h = codec.manhattan(initial_state)
+
+    try:
+        for weight in weights:
+            open_list = OpenList()
+            open_list.push(weight * start_h, (0, start_h, start_indices, initial_state, empty_pos))
+            best_g = {initial_state: 0}
+            parents = {initial_state: None}
+            limit = len(best) if best is not None else float('inf')
+
+            while open_list:
+                f, (g, h, indices, current_state, current_empty) = open_list.pop()
+                if g > best_g[current_state] or g + h >= limit:
+                    continue
+
+                if current_state == codec.goal:
+                    best = _path_to(codec, parents, current_state)
+                    limit = stats.best = g
+                    if on_solution is not None:
+                        on_solution(list(best))
+                    stats.report(nodes, len(open_list), None)
+                    break
+
+                nodes += 1
+                if nodes % PROGRESS_INTERVAL == 0:
+                    stats.report(nodes, len(open_list), None)
+                    if best is not None and deadline is not None and time.perf_counter() > deadline:
+                        raise SearchCancelled()
+
+                new_g = g + 1
+                for new_empty in codec.moves[current_empty]:
+                    new_state = codec.move_blank(current_state, current_empty, new_empty)
+                    if new_g >= best_g.get(new_state, new_g + 1):
+                        continue
+                    # Only the moved tile's distance, or its pattern's entry, changes
+                    tile = codec.tile_at(current_state, new_empty)
+                    new_indices = indices
+                    if indices is None:
+                        new_h = h + distance[tile][current_empty] - distance[tile][new_empty]
+                    else:
+                        number, step = owner[tile]
+                        table = tables[number]
+                        old_index = indices[number]
+                        new_index = old_index + (current_empty - new_empty) * step
+                        new_h = h + table[new_index] - table[old_index]
+                        new_indices = indices[:number] + (new_index,) + indices[number + 1:]
+                    if new_g + new_h >= limit:
+                        continue
+                    best_g[new_state] = new_g
+                    parents[new_state] = current_state
+                    open_list.push(new_g + weight * new_h, (new_g, new_h, new_indices, new_state, new_empty))
+            else:
+                # Nothing left that could beat the best solution, so it is optimal
+                break
+    except SearchCancelled:
+        if best is None:
+            raise
+
+    stats.count(nodes)
+    return best
+
+
+def solve_idastar(tiles, empty_pos=None, stats=None):
+    """Solve a board using IDA*, returning the blank's moves or None.
+
+    The heuristic is the largest of Manhattan distance plus linear conflict and, on
+    grids that have them, the additive pattern databases looked up for the board and
+    for its mirror image in the main diagonal. The mirror needs the same number of
+    moves but splits its tiles differently between the databases, so it is often the
+    tighter bound. All of them are updated per move.
+    """
+    codec, _, empty_pos = _prepare(tiles, empty_pos)
+    if stats is None:
+        stats = SearchStats()
+
+    n = codec.grid_size
+    blank = codec.blank
+    moves = codec.moves
+    coords = codec.coords
+    distance = codec.distance
+    row_conflict = codec.row_conflict
+    column_conflict = codec.column_conflict
+    tiles = [int(tile) for tile in np.asarray(tiles).ravel()]
+    row_conflicts = [row_conflict(tiles, line) for line in range(n)]
+    column_conflicts = [column_conflict(tiles, line) for line in range(n)]
+    path = []
+    nodes = 0
+    detailed = stats.detailed
+    generated = 0
+    duplicates = 0
+
+    # Grids without pattern databases fall back to linear conflict alone
+    database = PatternDatabase.get(n)
+    mirror = codec.mirror
+    if database is not None:
+        tables = database.tables
+        owner = database.owner
+        indices = database.indices(tiles)
+        # The mirrored board has tile mirror[t] at position mirror[p] wherever tiles has t at p
+        mirrored = [0] * codec.size
+        for pos, tile in enumerate(tiles):
+            mirrored[mirror[pos]] = mirror[tile]
+        mirror_indices = database.indices(mirrored)
+        # Per tile: its table, slot step and the same for the tile it becomes in the mirror
+        lookups = [None if owner[tile] is None else
+                   (tables[owner[tile][0]],) + owner[tile] +
+                   (tables[owner[mirror[tile]][0]],) + owner[mirror[tile]]
+                   for tile in range(codec.size)]
+    else:
+        lookups = [None] * codec.size
+    # The databases and their mirror almost always beat linear conflict, which is slow to keep up
+    use_conflicts = database is None
+
+    def search(empty, previous, g, conflict_h, pattern_h, mirror_h, bound):
+        # Returns True once the goal is reached, otherwise the smallest f above the bound
+        nonlocal nodes, generated, duplicates
+        h = conflict_h if conflict_h > pattern_h else pattern_h
+        if mirror_h > h:
+            h = mirror_h
+        f = g + h
+        if f > bound:
+            return f
+        if h == 0:
+            return True
+        nodes += 1
+        if nodes % PROGRESS_INTERVAL == 0:
+            stats.report(nodes, len(path), bound)
+        if detailed:
+            # Every child but the way back gets its heuristic updated
+            generated += len(moves[empty])
+            duplicates += previous is not None
+
+        minimum = float('inf')
+        empty_i, empty_j = coords[empty]
+        for target in moves[empty]:
+            if target == previous:
+                continue
+            tile = tiles[target]
+            tiles[empty], tiles[target] = tile, blank
+            new_conflict_h = conflict_h
+            if use_conflicts:
+                new_conflict_h += distance[tile][empty] - distance[tile][target]
+                # Only the lines the tile leaves and enters can change their conflicts
+                target_i, target_j = coords[target]
+                if target_i == empty_i:
+                    conflicts, old, new = column_conflicts, target_j, empty_j
+                    changed = (column_conflict(tiles, old), column_conflict(tiles, new))
+                else:
+                    conflicts, old, new = row_conflicts, target_i, empty_i
+                    changed = (row_conflict(tiles, old), row_conflict(tiles, new))
+                saved = (conflicts[old], conflicts[new])
+                new_conflict_h += changed[0] + changed[1] - saved[0] - saved[1]
+                conflicts[old], conflicts[new] = changed
+
+            # Only the moved tile's pattern database entry changes, on the board and on its mirror
+            new_pattern_h = pattern_h
+            new_mirror_h = mirror_h
+            lookup = lookups[tile]
+            if lookup is not None:
+                table, number, step, mirror_table, mirror_number, mirror_step = lookup
+                old_index = indices[number]
+                new_index = old_index + (empty - target) * step
+                new_pattern_h += table[new_index] - table[old_index]
+                indices[number] = new_index
+
+                old_mirror_index = mirror_indices[mirror_number]
+                new_mirror_index = old_mirror_index + (mirror[empty] - mirror[target]) * mirror_step
+                new_mirror_h += mirror_table[new_mirror_index] - mirror_table[old_mirror_index]
+                mirror_indices[mirror_number] = new_mirror_index
+
+            # Children over the bound are cut off here, which saves a call for most of them
+            new_h = new_conflict_h if new_conflict_h > new_pattern_h else new_pattern_h
+            if new_mirror_h > new_h:
+                new_h = new_mirror_h
+            if g + 1 + new_h > bound:
+                result = g + 1 + new_h
+            else:
+                path.append(coords[target])
+                result = search(target, empty, g + 1, new_conflict_h, new_pattern_h, new_mirror_h, bound)
+                if result is True:
+                    return True
+                path.pop()
+
+            if lookup is not None:
+                indices[number] = old_index
+                mirror_indices[mirror_number] = old_mirror_index
+            if use_conflicts:
+                conflicts[old], conflicts[new] = saved
+            tiles[empty], tiles[target] = blank, tile
+            if result < minimum:
+                minimum = result
+
+        return minimum
+
+    start_conflict_h = codec.linear_conflict(tiles) if use_conflicts else 0
+    start_pattern_h = database.heuristic(indices) if database is not None else 0
+    start_mirror_h = database.heuristic(mirror_indices) if database is not None else 0
+    bound = max(start_conflict_h, start_pattern_h, start_mirror_h)
+    while True:
+        result = search(empty_pos, None, 0, start_conflict_h, start_pattern_h, start_mirror_h, bound)
+        if result is True:
+            stats.count(nodes, len(path), generated, duplicates, generated - duplicates)
+            return path
+        if result == float('inf'):
+            stats.count(nodes, len(path), generated, duplicates, generated - duplicates)
+            return None
+        bound = result
+
+
+def solve_table(tiles, empty_pos=None, stats=None):
+    """Solve a board optimally by descending the exhaustive distance table, returning the blank's moves.
+
+    Every step moves to a neighbour one move closer to the goal, so no search is needed.
+    Only grids up to DISTANCE_TABLE_MAX_GRID have a table.
+    """
+    codec, state, empty = _prepare(tiles, empty_pos)
+    table = DistanceTable.get(codec.grid_size)
+    if table is None:
+        raise UnsolvableBoard(f"There is no distance table for {codec.grid_size}x{codec.grid_size} boards")
+    if stats is None:
+        stats = SearchStats()
+
+    path = []
+    generated = 0
+    distance = table.distance(state)
+    while distance:
+        for target in codec.moves[empty]:
+            new_state = codec.move_blank(state, empty, target)
+            generated += 1
+            if table.distance(new_state) == distance - 1:
+                break
+        path.append(codec.coords[target])
+        state, empty = new_state, target
+        distance -= 1
+    stats.count(len(path), 0, generated, 0, generated + 1)
+    return path
+
+
+def _solvable(boards, grid_size):
+    """Which rows of a (count, size) board array can be slid back to the goal"""
+    size = grid_size * grid_size
+    # Permutation parity from the inversion count, one position against all later ones at a time
+    inversions = np.zeros(len(boards), dtype=np.int64)
+    for pos in range(size - 1):
+        inversions += (boards[:, pos, None] > boards[:, pos + 1:]).sum(axis=1)
+    i, j = np.divmod(np.argmax(boards == size - 1, axis=1), grid_size)
+    return inversions % 2 == (2 * (grid_size - 1) - i - j) % 2
+
+
+def board_distances(boards, grid_size):
+    """Moves to the goal for each row of a (count, size) array of solvable boards.
+
+    Exact on grids with a distance table. On larger grids it is an admissible lower
+    bound: the larger of Manhattan distance and the pattern databases, if any.
+    """
+    boards = np.asarray(boards)
+    codec = BoardCodec.get(grid_size)
+    table = DistanceTable.get(grid_size)
+    if table is not None:
+        # The same Lehmer rank as DistanceTable.rank, a column of boards at a time
+        inner = boards[:, 1:-1].astype(np.int64)
+        ranks = np.zeros(len(boards), dtype=np.int64)
+        for k in range(inner.shape[1]):
+            smaller = (inner[:, :k] < inner[:, k, None]).sum(axis=1)
+            ranks = ranks * (codec.size - k) + inner[:, k] - smaller
+        return np.frombuffer(table.table, dtype=np.uint8)[ranks]
+
+    distances = np.asarray(codec.distance)[boards, np.arange(codec.size)].sum(axis=1)
+    database = PatternDatabase.get(grid_size)
+    if database is not None:
+        positions = np.argsort(boards, axis=1)
+        pattern_h = np.zeros(len(boards), dtype=np.int64)
+        for pattern, pattern_table in zip(database.patterns, database.tables):
+            index = (positions[:, list(pattern)] * codec.size ** np.arange(len(pattern), dtype=np.int64)).sum(axis=1)
+            pattern_h += np.frombuffer(pattern_table, dtype=np.uint8)[index]
+        distances = np.maximum(distances, pattern_h)
+    return distances
+
+
+def _boards_at_rank(ranks, grid_size):
+    """Boards for DistanceTable ranks, the inverse of board_distances' ranking"""
+    size = grid_size * grid_size
+    count = len(ranks)
+    digits = []
+    for radix in range(3, size + 1):
+        digits.append(ranks % radix)
+        ranks = ranks // radix
+    digits.reverse()
+
+    boards = np.empty((count, size), dtype=np.uint8)
+    unused = np.ones((count, size), dtype=bool)
+    rows = np.arange(count)
+    for pos, digit in enumerate(digits, 1):
+        # The digit-th smallest tile not placed yet
+        tile = np.argmax(np.cumsum(unused, axis=1) > digit[:, None], axis=1)
+        boards[:, pos] = tile
+        unused[rows, tile] = False
+
+    # The two corner tiles go in whichever order is solvable
+    left = np.argmax(unused, axis=1)
+    unused[rows, left] = False
+    right = np.argmax(unused, axis=1)
+    boards[:, 0], boards[:, -1] = left, right
+    swap = ~_solvable(boards, grid_size)
+    boards[swap, 0], boards[swap, -1] = right[swap], left[swap]
+    return boards
+
+
+def random_walks(grid_size, count, length, rng=None):
+    """Boards reached from the goal by random walks of length moves that never undo the previous move.
+
+    Returned as a (count, grid_size ** 2) uint8 array. A walk bounds a board's distance
+    from above only, since it may wander back towards the goal.
+    """
+    rng = np.random.default_rng(rng)
+    codec = BoardCodec.get(grid_size)
+    size = codec.size
+    neighbors = np.full((size, 4), -1, dtype=np.int64)
+    for pos, targets in enumerate(codec.moves):
+        neighbors[pos, :len(targets)] = targets
+
+    boards = np.broadcast_to(np.arange(size, dtype=np.uint8), (count, size)).copy()
+    rows = np.arange(count)
+    empty = np.full(count, size - 1)
+    previous = np.full(count, -1)
+    for _ in range(length):
+        # Pick uniformly among the moves that do not undo the last one
+        targets = neighbors[empty]
+        keys = rng.random(targets.shape)
+        keys[(targets < 0) | (targets == previous[:, None])] = -1
+        target = targets[rows, np.argmax(keys, axis=1)]
+        boards[rows, empty] = boards[rows, target]
+        boards[rows, target] = size - 1
+        previous, empty = empty, target
+    return boards
+
+
+def random_boards(grid_size, count, distance=None, rng=None):
+    """Random solvable boards as a (count, grid_size ** 2) uint8 array of tile numbers.
+
+    Without a distance every solvable board is equally likely: a random permutation is
+    drawn and, if it has the wrong parity, two tiles other than the blank are swapped.
+    With a distance every board is that many moves from the goal. On grids with a
+    distance table they are drawn uniformly from all such boards; on larger grids they
+    come from random walks of that length whose lower bound proves no shorter solution.
+    Longer walks are rarely proven, so there distance can be at most about 38 on 4x4
+    and 50 on 5x5; beyond that a ValueError is raised. rng may be a numpy Generator or
+    a seed.
+    """
+    rng = np.random.default_rng(rng)
+    size = grid_size * grid_size
+    rows = np.arange(count)
+
+    if distance is None:
+        boards = rng.permuted(np.broadcast_to(np.arange(size, dtype=np.uint8), (count, size)), axis=1)
+        swap = ~_solvable(boards, grid_size)
+        first = np.where(np.argmax(boards == size - 1, axis=1) < 2, 2, 0)[swap]
+        swapped = rows[swap]
+        boards[swapped, first], boards[swapped, first + 1] = boards[swapped, first + 1], boards[swapped, first]
+        return boards
+
+    table = DistanceTable.get(grid_size)
+    if table is not None:
+        ranks = np.flatnonzero(np.frombuffer(table.table, dtype=np.uint8) == distance)
+        if ranks.size == 0:
+            raise ValueError(f"No {grid_size}x{grid_size} board is {distance} moves from the goal")
+        return _boards_at_rank(rng.choice(ranks, count), grid_size)
+
+    found = []
+    found_count = 0
+    batch = max(count, 1024)
+    for _ in range(RANDOM_WALK_ROUNDS):
+        boards = random_walks(grid_size, batch, distance, rng)
+        # A walk is a solution, so a lower bound equal to its length proves it optimal
+        boards = boards[board_distances(boards, grid_size) == distance]
+        found.append(boards)
+        found_count += len(boards)
+        if found_count >= count:
+            return np.concatenate(found)[:count]
+    raise ValueError(f"Could not find {count} {grid_size}x{grid_size} boards provably {distance} moves from "
+                     f"the goal; random walks are rarely proven beyond about 38 moves on 4x4 and 50 on 5x5")
+
+
+def parse_board(text):
+    """Read a board written as its tile numbers, row by row, separated by spaces or commas"""
+    return [int(tile) for tile in text.replace(',', ' ').split()]
+
+
+def solve_report(tiles, algorithm='auto', cache=None, detailed=False, budget=ANYTIME_BUDGET):
+    """Solve one board and describe the outcome as a JSON-ready dict"""
+    report = {'board': [int(tile) for tile in np.asarray(tiles).ravel()], 'algorithm': algorithm}
+    stats = SearchStats(detailed=detailed)
+    start = time.perf_counter()
+    try:
+        path = solve(tiles, algorithm, stats=stats, cache=cache, budget=budget)
+    except UnsolvableBoard as e:
+        report['error'] = str(e)
+        return report
+    report.update(stats.as_dict())
+    # Measured here so answers from the cache are timed too
+    report['seconds'] = round(time.perf_counter() - start, 6)
+    report['solved'] = path is not None
+    if path is not None:
+        report['length'] = len(path)
+        report['moves'] = [list(move) for move in path]
+    return report
+
+
+def _load_tables(algorithm, boards):
+    """Build or map the heuristic tables algorithm uses on these boards and return their grid sizes.
+
+    Called before any board is timed, so building a missing table does not count
+    towards the first board's seconds.
+    """
+    grid_sizes = set()
+    if algorithm in ('auto', 'idastar', 'anytime', 'table'):
+        grid_sizes = {math.isqrt(len(tiles)) for tiles in boards
+                      if len(tiles) >= 4 and math.isqrt(len(tiles)) ** 2 == len(tiles)}
+    for grid_size in grid_sizes:
+        PatternDatabase.get(grid_size)
+        DistanceTable.get(grid_size)
+    return grid_sizes
+
+
+_worker_cache = None
+
+
+def _init_worker(grid_sizes, cache_path=None):
+    # Map the pattern databases up front. The tables are read-only file mappings, so every
+    # worker shares the same physical pages through the page cache instead of a private copy.
+    global _worker_cache
+    for grid_size in grid_sizes:
+        PatternDatabase.get(grid_size)
+        DistanceTable.get(grid_size)
+    # Always a connection of the worker's own: an sqlite connection must not cross a fork
+    _worker_cache = SolutionCache(cache_path) if cache_path is not None else None
+
+
+def _solve_chunk(start, boards, algorithm, detailed, budget, cache=None):
+    if cache is None:
+        cache = _worker_cache
+    reports = []
+    for index, tiles in enumerate(boards, start):
+        report = solve_report(tiles, algorithm, cache, detailed, budget)
+        report['index'] = index
+        reports.append(report)
+    return reports
+
+
+def solve_many(boards, algorithm='auto', workers=None, chunksize=None, ordered=True, cache_path=None,
+               detailed=False, budget=ANYTIME_BUDGET):
+    """Solve many boards across worker processes, yielding a solve_report for each.
+
+    Boards are sent to the workers in chunks of chunksize (by default enough for about
+    four chunks per worker). Reports come back in input order when ordered is True,
+    otherwise as soon as their chunk finishes; each carries the board's 'index' in boards.
+    With cache_path, every worker shares a SolutionCache stored in that sqlite file,
+    detailed asks for the full SearchStats counters and budget is passed on to solve.
+    """
+    boards = [[int(tile) for tile in np.asarray(tiles).ravel()] for tiles in boards]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, len(boards) // (workers * 4))
+
+    # Build any missing heuristic tables once here rather than in every worker at the same time
+    grid_sizes = _load_tables(algorithm, boards)
+
+    if workers == 1 or len(boards) <= chunksize:
+        cache = SolutionCache(cache_path) if cache_path is not None else None
+        yield from _solve_chunk(0, boards, algorithm, detailed, budget, cache)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(grid_sizes, cache_path)) as executor:
+        futures = [executor.submit(_solve_chunk, start, boards[start:start + chunksize], algorithm, detailed, budget)
+                   for start in range(0, len(boards), chunksize)]
+        try:
+            for future in (futures if ordered else as_completed(futures)):
+                yield from future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def _read_boards(source, output):
+    """Yield (line number, tiles) for each board in source, writing an error report for lines that are not boards"""
+    for number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            yield number, parse_board(line)
+        except ValueError:
+            report = {'line': number, 'board': line, 'error': "Boards must be whitespace or comma separated tile numbers"}
+            output.write(json.dumps(report) + '\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve sliding puzzle boards without opening the game window.")
+    parser.add_argument('input', nargs='?', help="file with one board per line (default: stdin)")
+    parser.add_argument('-a', '--algorithm', choices=ALGORITHMS, default='auto',
+                        help="search to run (default: distance table on 3x3, IDA* on larger boards)")
+    parser.add_argument('--budget', type=float, default=ANYTIME_BUDGET, metavar='SECONDS',
+                        help=f"time the anytime search spends looking for shorter solutions (default: {ANYTIME_BUDGET})")
+    parser.add_argument('-o', '--output', help="write results to this file instead of stdout")
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help="worker processes to solve boards in, 0 for one per CPU core (default: 1)")
+    parser.add_argument('--chunksize', type=int, help="boards sent to a worker at a time")
+    parser.add_argument('--unordered', action='store_true',
+                        help="write results as they finish instead of in input order")
+    parser.add_argument('--cache', metavar='FILE',
+                        help="sqlite file to reuse optimal solutions from, and add new ones to")
+    parser.add_argument('--stats', action='store_true',
+                        help="also count children generated, duplicates pruned and heuristic calls")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="time every call the solvers make and save a Chrome trace; slows solving down")
+    args = parser.parse_args(argv)
+    if args.profile and args.jobs != 1:
+        parser.error("--profile can only follow one process, use it with --jobs 1")
+
+    source = open(args.input) if args.input else sys.stdin
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.jobs == 1:
+            # Solve as the boards arrive, so piped input gets answers straight away
+            cache = SolutionCache(args.cache) if args.cache else None
+            profiler = SearchProfiler() if args.profile else None
+            for number, tiles in _read_boards(source, output):
+                _load_tables(args.algorithm, [tiles])
+                if profiler is not None:
+                    with profiler:
+                        report = solve_report(tiles, args.algorithm, cache, args.stats, args.budget)
+                else:
+                    report = solve_report(tiles, args.algorithm, cache, args.stats, args.budget)
+                report['line'] = number
+                output.write(json.dumps(report) + '\n')
+                output.flush()
+            if profiler is not None:
+                profiler.write_trace(args.profile)
+                for phase, seconds in profiler.phases().items():
+                    print(f"{phase}: {seconds:.3f}s", file=sys.stderr)
+        else:
+            numbered = list(_read_boards(source, output))
+            numbers = [number for number, _ in numbered]
+            boards = [tiles for _, tiles in numbered]
+            for report in solve_many(boards, args.algorithm, args.jobs or None, args.chunksize,
+                                     not args.unordered, args.cache, args.stats, args.budget):
+                report['line'] = numbers[report.pop('index')]
+                output.write(json.dumps(report) + '\n')
+                output.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()